@@ -1,13 +1,23 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import datetime
 import random
+from collections import Counter, deque
 import json
+import os
+import time
+import atexit
+import sqlite3
+import threading
+import functools
+import requests
 import gspread
 from google.oauth2.service_account import Credentials
 
 # Set the page configuration
 st.set_page_config(page_title="Student Tracker Pro", page_icon="🎓", layout="wide")
+RUN_STARTED = time.perf_counter()
 
 # ==========================================
 # --- SISTEM LOGIN (GATEKEEPER) ---
@@ -37,6 +47,85 @@ if not st.session_state.logged_in:
     
     st.stop() 
 
+# ==========================================
+# --- DIAGNOSTICS (OPT-IN) ---
+# ==========================================
+# Hidupkan dengan diagnostics = true dalam secrets, atau ?diagnostics=1 pada URL.
+# Setiap fasa rerun dan setiap load_data / save_data dimasa; sampel dikongsi semua sesi (percentile)
+# dan ditulis sebagai JSON lines ke diagnostics_log (oleh thread sendiri, diputar ke <log>.1 bila penuh).
+DIAGNOSTICS_ON = bool(st.secrets.get("diagnostics", False)) or st.query_params.get("diagnostics") == "1"
+
+class Diagnostics:
+    WINDOW = 500                       # sampel terakhir disimpan bagi setiap nama
+    MAX_LOG_BYTES = 20 * 1024 * 1024   # log dipindah ke <log>.1 bila melepasi saiz ini (paling banyak dua fail)
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.samples = {}  # nama -> deque masa (ms)
+        self.kinds = {}    # nama -> phase | page | load | save
+        self.pending = []  # baris JSON yang belum ditulis ke fail
+        if self.path:
+            threading.Thread(target=self._run, name="diagnostics-log", daemon=True).start()
+
+    def record(self, event):
+        # Cuma tambah ke buffer bawah lock; fail ditulis oleh thread _run, bukan oleh rerun sesi
+        line = json.dumps(event, default=str) + "\n" if self.path else None
+        with self.lock:
+            self.samples.setdefault(event["name"], deque(maxlen=self.WINDOW)).append(event["ms"])
+            self.kinds[event["name"]] = event["kind"]
+            if line:
+                self.pending.append(line)
+                self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                lines, self.pending = self.pending, []
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) >= self.MAX_LOG_BYTES:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(lines)
+            except OSError:
+                pass
+            time.sleep(1)  # kumpul event sesaat sebelum tulis seterusnya
+
+    def summary(self):
+        with self.lock:
+            samples = {name: np.array(ms) for name, ms in self.samples.items()}
+            kinds = dict(self.kinds)
+        rows = [{"name": name, "kind": kinds[name], "count": len(ms), "p50": np.percentile(ms, 50), "p90": np.percentile(ms, 90), "p99": np.percentile(ms, 99), "max": ms.max()} for name, ms in samples.items()]
+        return pd.DataFrame(rows, columns=["name", "kind", "count", "p50", "p90", "p99", "max"]).sort_values("p90", ascending=False)
+
+@st.cache_resource
+def init_diagnostics():
+    return Diagnostics(st.secrets.get("diagnostics_log", "diagnostics.jsonl"))
+
+if DIAGNOSTICS_ON:
+    diagnostics = init_diagnostics()
+    st.session_state.setdefault("_diag_session", f"{random.getrandbits(32):08x}")
+    st.session_state._diag_run = st.session_state.get("_diag_run", 0) + 1
+    st.session_state._trace = []
+
+def trace(kind, name, started, frames=(), **fields):
+    # Rekod satu fasa / panggilan yang bermula pada `started` (perf_counter); saiz frame hanya dikira bila dihidupkan
+    if not DIAGNOSTICS_ON:
+        return
+    event = {"ts": datetime.datetime.now().isoformat(timespec="milliseconds"), "session": st.session_state._diag_session, "run": st.session_state._diag_run,
+             "kind": kind, "name": name, "ms": round((time.perf_counter() - started) * 1000, 2), **fields}
+    if frames:
+        event["rows"] = sum(len(df) for df in frames)
+        event["bytes"] = int(sum(df.memory_usage(index=False, deep=True).sum() for df in frames))
+    st.session_state._trace.append(event)
+    diagnostics.record(event)
+
+trace("phase", "login gate", RUN_STARTED)
+STARTUP_STARTED = time.perf_counter()
+
 # ==========================================
 # --- GOOGLE SHEETS DATABASE CONNECTION ---
 # ==========================================
@@ -54,56 +143,725 @@ def init_gsheets():
 client = init_gsheets()
 DB_NAME = "StudentTracker_DB"
 
-def load_data(ws_name, cols, bool_cols=[], float_cols=[]):
+def to_sheet_values(df):
+    df_clean = df.copy()
+    for c in df_clean.columns:
+        if pd.api.types.is_datetime64_any_dtype(df_clean[c]):
+            df_clean[c] = df_clean[c].dt.strftime("%Y-%m-%d")
+        elif isinstance(df_clean[c].dtype, pd.CategoricalDtype):
+            df_clean[c] = df_clean[c].astype(object)
+    df_clean = df_clean.fillna("").astype(str)
+    return [df_clean.columns.values.tolist()] + df_clean.values.tolist()
+
+def rewrite_sheet(ws, values, prev):
+    # Tulis dulu, baru kosongkan baki -- sheet tak pernah tinggal kosong kalau update gagal
+    ws.update(range_name="A1", values=values)
+    width = len(values[0])
+    stale = []
+    last_row = ws.row_count if prev is None else max(len(prev), len(values))
+    if last_row > len(values):
+        stale.append(f"A{len(values) + 1}:{gspread.utils.rowcol_to_a1(last_row, max(width, ws.col_count))}")
+    if ws.col_count > width and (prev is None or len(prev[0]) > width):
+        stale.append(f"{gspread.utils.rowcol_to_a1(1, width + 1)}:{gspread.utils.rowcol_to_a1(len(values), ws.col_count)}")
+    if stale:
+        ws.batch_clear(stale)
+
+def sync_sheet(ws, values, prev):
+    header, rows = values[0], values[1:]
+    if prev is None or prev[0] != header or len(rows) < len(prev) - 1:
+        return rewrite_sheet(ws, values, prev)
+
+    changed = [i for i, old in enumerate(prev[1:]) if rows[i] != old]
+    if len(changed) > max(1, len(rows) // 2):
+        # Kebanyakan baris berubah (sort / reorder) -- lebih murah tulis semula sekali
+        return rewrite_sheet(ws, values, prev)
+
+    updates = []
+    for i in changed:
+        diff_cols = [j for j, (a, b) in enumerate(zip(prev[i + 1], rows[i])) if a != b]
+        first, last = diff_cols[0], diff_cols[-1]
+        cell_range = f"{gspread.utils.rowcol_to_a1(i + 2, first + 1)}:{gspread.utils.rowcol_to_a1(i + 2, last + 1)}"
+        updates.append({"range": cell_range, "values": [rows[i][first:last + 1]]})
+    if updates:
+        ws.batch_update(updates)
+
+    new_rows = rows[len(prev) - 1:]
+    if new_rows:
+        ws.append_rows(new_rows, table_range="A1")
+
+def coerce_column(col, kind):
+    if kind == "bool":
+        return col.astype(str).str.lower() == 'true'
+    if kind == "int":
+        return pd.to_numeric(col, errors='coerce').fillna(0).astype(int)
+    if kind == "float":
+        return pd.to_numeric(col, errors='coerce').fillna(0.0).astype(float)
+    if kind == "date":
+        if not pd.api.types.is_datetime64_any_dtype(col):
+            col = pd.to_datetime(col.where(col.astype(str).str.strip() != ""), errors='coerce', format="mixed")
+        return col.astype("datetime64[ns]")
+    if isinstance(kind, list):
+        # Pilihan tetap app dulu, nilai lain yang sudah ada dalam data dikekalkan di belakang
+        values = col.astype(object).where(col.notna(), "").astype(str)
+        extra = sorted(set(values) - set(kind) - {""})
+        return pd.Series(pd.Categorical(values.where(values != ""), categories=kind + extra), index=col.index)
+    return col.astype(object).where(col.notna(), "").astype(str)
+
+def apply_schema(df, schema):
+    # Tukar setiap lajur kepada dtype sebenar sekali sahaja semasa load / tambah rekod
+    df = df.copy()
+    for c, kind in schema.items():
+        if c not in df.columns:
+            df[c] = ""
+        df[c] = coerce_column(df[c], kind)
+    return df[list(schema)]
+
+def build_frame(values, schema):
+    # Pulangkan (frame, snapshot). Snapshot None bila header dalam storage tak sama dengan schema.
+    cols = list(schema)
     df = pd.DataFrame(columns=cols)
-    if client:
+    synced_header = None
+    if values:
+        header = values[0]
+        # API potong sel kosong di hujung baris, jadi pad semula ikut header
+        rows = [(row + [""] * (len(header) - len(row)))[:len(header)] for row in values[1:]]
+        if rows:
+            df = pd.DataFrame(rows, columns=header)
+            synced_header = header
+    df = apply_schema(df.loc[:, ~df.columns.duplicated()], schema)
+    return df, (to_sheet_values(df) if synced_header == cols else None)
+
+class StorageError(Exception):
+    pass
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # Pulangkan berapa saat kita terpaksa tunggu token
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+class SheetsScheduler:
+    # Semua panggilan gspread lalu sini: had kuota per minit (baca & tulis berasingan), retry dengan
+    # exponential backoff + jitter, bacaan serentak yang sama dikongsi, dan metrik setiap jenis panggilan
+    RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+    def __init__(self, per_minute=60, max_attempts=5, base_delay=1.0, max_delay=32.0):
+        self.buckets = {"read": TokenBucket(per_minute), "write": TokenBucket(per_minute)}
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.inflight = {}  # kunci bacaan -> {"event", "result" / "error"}
+        self.stats = {}     # nama panggilan -> kiraan & latency
+
+    @staticmethod
+    def status_code(e):
+        return getattr(getattr(e, "response", None), "status_code", None)
+
+    def retryable(self, e, idempotent):
+        if isinstance(e, gspread.exceptions.APIError):
+            code = self.status_code(e)
+            # append tak idempotent: hanya 429 (ditolak sebelum diproses) selamat diulang
+            return code == 429 if not idempotent else code in self.RETRY_STATUS
+        return idempotent and isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+    def _record(self, name, **counts):
+        with self.lock:
+            stat = self.stats.setdefault(name, {"calls": 0, "errors": 0, "retries": 0, "deduped": 0, "total_ms": 0.0, "max_ms": 0.0, "throttled_ms": 0.0})
+            for field, value in counts.items():
+                stat[field] = max(stat[field], value) if field == "max_ms" else stat[field] + value
+
+    def _call(self, kind, name, fn, args, kwargs, idempotent):
+        for attempt in range(self.max_attempts):
+            throttled = self.buckets[kind].acquire()
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+                elapsed = (time.perf_counter() - started) * 1000
+                self._record(name, calls=1, total_ms=elapsed, max_ms=elapsed, throttled_ms=throttled * 1000)
+                return result
+            except Exception as e:
+                elapsed = (time.perf_counter() - started) * 1000
+                self._record(name, calls=1, errors=1, total_ms=elapsed, max_ms=elapsed, throttled_ms=throttled * 1000)
+                if attempt + 1 >= self.max_attempts or not self.retryable(e, idempotent):
+                    raise
+                self._record(name, retries=1)
+                # Full jitter: tunggu rawak antara 0 dan had backoff
+                time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    def call(self, kind, name, fn, *args, dedupe=None, idempotent=True, **kwargs):
+        if dedupe is None:
+            return self._call(kind, name, fn, args, kwargs, idempotent)
+        with self.lock:
+            flight = self.inflight.get(dedupe)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[dedupe] = {"event": threading.Event()}
+        if not leader:
+            flight["event"].wait()
+            self._record(name, deduped=1)
+            if "error" in flight:
+                raise flight["error"]
+            return flight["result"]
         try:
-            sheet = client.open(DB_NAME)
+            flight["result"] = self._call(kind, name, fn, args, kwargs, idempotent)
+            return flight["result"]
+        except Exception as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(dedupe, None)
+            flight["event"].set()
+
+    def metrics(self):
+        with self.lock:
+            return {name: dict(stat, avg_ms=stat["total_ms"] / stat["calls"] if stat["calls"] else 0.0) for name, stat in self.stats.items()}
+
+class ScheduledWorksheet:
+    # Proxy Worksheet untuk sync_sheet: panggilan tulis melalui scheduler, atribut lain terus ke gspread
+    WRITES = {"update", "batch_update", "batch_clear", "clear", "append_rows"}
+
+    def __init__(self, ws, scheduler):
+        self.ws = ws
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+        attr = getattr(self.ws, name)
+        if name in self.WRITES:
+            return functools.partial(self.scheduler.call, "write", f"worksheet.{name}", attr, idempotent=name != "append_rows")
+        return attr
+
+class SheetWriter:
+    # Write-behind: save_data cuma letak nilai terkini dalam queue, thread ini yang hantar ke Google.
+    # Simpanan berturut-turut pada tab yang sama digabung jadi satu flush.
+    def __init__(self, client, scheduler, delay=1.0, max_attempts=4, on_synced=None):
+        self.client = client
+        self.scheduler = scheduler
+        self.delay = delay
+        self.max_attempts = max_attempts
+        self.on_synced = on_synced  # dipanggil selepas flush berjaya bila queue kosong (busy masih ditanda)
+        self.cond = threading.Condition()
+        self.pending = {}    # ws_name -> (values, due_time)
+        self.attempts = {}   # ws_name -> cubaan yang dah gagal untuk nilai pending
+        self.failed = {}     # ws_name -> (values, error)
+        self.synced = {}     # ws_name -> nilai terakhir yang disahkan ada dalam sheet
+        self.sheets = {}     # ws_name -> gspread Worksheet (cache handle)
+        self.busy = None
+        threading.Thread(target=self._run, name="sheet-writer", daemon=True).start()
+
+    def seed(self, ws_name, values):
+        with self.cond:
+            if ws_name not in self.pending and ws_name != self.busy:
+                self.synced[ws_name] = values
+
+    def latest(self, ws_name):
+        # Nilai terkini yang akan ada dalam sheet: yang masih menunggu, atau yang terakhir disahkan
+        with self.cond:
+            if ws_name in self.pending:
+                return self.pending[ws_name][0]
+            return self.synced.get(ws_name)
+
+    def knows(self, ws_name):
+        with self.cond:
+            return ws_name in self.synced or ws_name in self.pending or ws_name == self.busy
+
+    def submit(self, ws_name, values, delay=None):
+        with self.cond:
+            if ws_name not in self.pending and self.busy != ws_name and self.synced.get(ws_name) == values:
+                return
+            self.pending[ws_name] = (values, time.time() + (self.delay if delay is None else delay))
+            self.attempts.pop(ws_name, None)
+            self.failed.pop(ws_name, None)
+            self.cond.notify()
+
+    def retry_failed(self):
+        with self.cond:
+            for ws_name, (values, error) in self.failed.items():
+                self.pending.setdefault(ws_name, (values, time.time()))
+            self.failed.clear()
+            self.cond.notify()
+
+    def status(self):
+        with self.cond:
+            waiting = set(self.pending) | ({self.busy} if self.busy else set())
+            return sorted(waiting), {ws_name: error for ws_name, (values, error) in self.failed.items()}
+
+    def flush(self, timeout=30):
+        deadline = time.time() + timeout
+        with self.cond:
+            self.pending = {ws_name: (values, 0) for ws_name, (values, due) in self.pending.items()}
+            self.cond.notify_all()
+            while (self.pending or self.busy) and time.time() < deadline:
+                self.cond.wait(0.1)
+
+    def _worksheet(self, ws_name):
+        if ws_name not in self.sheets:
+            sheet = self.scheduler.call("read", "open", self.client.open, DB_NAME)
+            ws = self.scheduler.call("read", "worksheet", sheet.worksheet, ws_name)
+            self.sheets[ws_name] = ScheduledWorksheet(ws, self.scheduler)
+        return self.sheets[ws_name]
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending or min(due for values, due in self.pending.values()) > time.time():
+                    wait = min((due for values, due in self.pending.values()), default=time.time() + 60) - time.time()
+                    self.cond.wait(max(wait, 0.05))
+                ws_name = min(self.pending, key=lambda name: self.pending[name][1])
+                values, due = self.pending.pop(ws_name)
+                prev = self.synced.get(ws_name)
+                self.busy = ws_name
             try:
-                ws = sheet.worksheet(ws_name)
-            except gspread.exceptions.WorksheetNotFound:
-                ws = sheet.add_worksheet(title=ws_name, rows="100", cols=str(len(cols)))
-                ws.update(range_name="A1", values=[cols])
-                return df
-            
-            records = ws.get_all_records()
-            if records:
-                df = pd.DataFrame(records)
+                sync_sheet(self._worksheet(ws_name), values, prev)
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            if error is None and self.on_synced is not None and not self.pending:
+                self.on_synced()
+            with self.cond:
+                self.busy = None
+                if error is None:
+                    self.synced[ws_name] = values
+                    self.attempts.pop(ws_name, None)
+                else:
+                    # Tak pasti apa yang sempat ditulis -- flush seterusnya tulis semula penuh
+                    self.synced.pop(ws_name, None)
+                    self.sheets.pop(ws_name, None)
+                    attempt = self.attempts.get(ws_name, 0) + 1
+                    if ws_name in self.pending:
+                        pass  # Ada nilai lebih baru, ia akan menggantikan yang ini
+                    elif attempt < self.max_attempts:
+                        self.attempts[ws_name] = attempt
+                        self.pending[ws_name] = (values, time.time() + 2 ** attempt + random.random())
+                    else:
+                        self.attempts.pop(ws_name, None)
+                        self.failed[ws_name] = (values, error)
+                self.cond.notify_all()
+
+class StorageBackend:
+    # Kontrak yang app guna: load_all([(ws_name, schema)]) -> {ws_name: DataFrame}, load_columns([(spec, columns)]),
+    # save(ws_name, df, rows=None), revision(), status() -> (pending, failed), retry_failed(), flush()
+    label = ""
+    # Backend hidup merentas rerun tetapi kelas dalam skrip ditakrif semula setiap rerun,
+    # jadi tangkap melalui storage.Error, bukan nama StorageError terus
+    Error = StorageError
+
+    def load_all(self, specs):
+        raise NotImplementedError
+
+    def save(self, ws_name, df, rows=None, delay=None):
+        # rows: kedudukan baris yang disunting sahaja (tiada tambah/buang), supaya backend boleh tampal baris itu
+        # delay: tempoh debounce sebelum ditulis (backend yang menulis terus boleh abaikan)
+        raise NotImplementedError
+
+    def load_columns(self, requests):
+        # Projection: requests = [((ws_name, schema), columns)], pulangkan frame dengan lajur yang diminta sahaja.
+        # Backend boleh override untuk elak baca seluruh jadual.
+        frames = self.load_all([spec for spec, columns in requests])
+        return [frames[spec[0]][columns] for spec, columns in requests]
+
+    def revision(self):
+        # Token yang berubah bila data diubah dari luar proses ini
+        return None
+
+    def status(self):
+        return [], {}
+
+    def retry_failed(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def metrics(self):
+        # nama panggilan -> {calls, errors, retries, avg_ms, max_ms, ...}; kosong untuk backend tempatan
+        return {}
+
+class GSheetsBackend(StorageBackend):
+    label = "🟢 Connected to Google Sheets Database"
+
+    REVISION_TTL = 10  # saat antara semakan modifiedTime pada Drive
+
+    def __init__(self, client, per_minute=60):
+        self.client = client
+        self.scheduler = SheetsScheduler(per_minute)
+        self.writer = SheetWriter(client, self.scheduler, on_synced=self.rebaseline)
+        self.spreadsheet = None
+        self.remote_revision = None  # modifiedTime terakhir yang kita tahu puncanya
+        self.foreign_changes = 0     # token revision(): naik hanya bila modifiedTime berubah bukan kerana kita
+        self.checked_at = 0.0
+
+    def _sheet(self):
+        if self.spreadsheet is None:
+            self.spreadsheet = self.scheduler.call("read", "open", self.client.open, DB_NAME, dedupe=("open", DB_NAME))
+        return self.spreadsheet
+
+    def _read(self, name, fn, *args, **kwargs):
+        # Bacaan dengan argumen sama yang sedang berjalan dikongsi, bukan dihantar dua kali
+        return self.scheduler.call("read", name, fn, *args, dedupe=(name, repr(args), repr(kwargs)), **kwargs)
+
+    def revision(self):
+        # Satu panggilan Drive yang murah, paling kerap sekali setiap REVISION_TTL saat
+        if time.time() - self.checked_at >= self.REVISION_TTL:
+            self.checked_at = time.time()
+            try:
+                remote = self._read("get_lastUpdateTime", self._sheet().get_lastUpdateTime)
+                if remote != self.remote_revision:
+                    self.remote_revision = remote
+                    self.foreign_changes += 1
+            except Exception as e:
+                self.spreadsheet = None
+        return self.foreign_changes
+
+    def rebaseline(self):
+        # Tulisan kita sendiri pun ubah modifiedTime -- ambil nilai baru sebagai asas supaya ia tak buang cache.
+        # Perubahan luar yang berlaku antara semakan terakhir dan flush ini ikut terserap (paling lama REVISION_TTL).
+        try:
+            self.remote_revision = self._read("get_lastUpdateTime", self._sheet().get_lastUpdateTime)
         except Exception as e:
-            pass
-            
-    for c in bool_cols:
-        if c in df.columns: df[c] = df[c].astype(str).str.lower() == 'true'
-    for c in float_cols:
-        if c in df.columns: df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0.0)
-            
-    for c in cols:
-        if c not in df.columns: df[c] = ""
-    return df[cols]
+            self.spreadsheet = None
+
+    def load_all(self, specs):
+        # Satu open + satu values_batch_get untuk semua tab, bukan 3 panggilan setiap tab
+        raw = {}
+        try:
+            sheet = self._sheet()
+            existing = {ws.title for ws in self._read("worksheets", sheet.worksheets)}
+            missing = [(name, list(schema)) for name, schema in specs if name not in existing]
+            if missing:
+                self.scheduler.call("write", "add_worksheets", sheet.batch_update, {"requests": [{"addSheet": {"properties": {"title": name, "gridProperties": {"rowCount": 100, "columnCount": len(cols)}}}} for name, cols in missing]}, idempotent=False)
+                self.scheduler.call("write", "values_batch_update", sheet.values_batch_update, {"valueInputOption": "RAW", "data": [{"range": f"'{name}'!A1", "values": [cols]} for name, cols in missing]})
+                for name, cols in missing:
+                    self.writer.seed(name, [cols])
+                self.rebaseline()
+
+            present = [name for name, schema in specs if name in existing]
+            if present:
+                resp = self._read("values_batch_get", sheet.values_batch_get, [f"'{name}'" for name in present])
+                for name, value_range in zip(present, resp.get("valueRanges", [])):
+                    raw[name] = value_range.get("values", [])
+        except Exception as e:
+            # Jangan pulangkan jadual kosong seolah-olah data memang tiada -- page akan tunjuk ralat
+            self.spreadsheet = None
+            raise self.Error(f"Could not load {', '.join(name for name, schema in specs)} from Google Sheets ({type(e).__name__}: {e})") from e
 
-def save_data(ws_name, df):
-    if client and not df.empty:
+        frames = {}
+        for name, schema in specs:
+            frames[name], snapshot = build_frame(raw.get(name), schema)
+            # Simpan snapshot apa yang ada dalam sheet supaya save_data boleh hantar delta sahaja
+            if snapshot is not None:
+                self.writer.seed(name, snapshot)
+        return frames
+
+    def load_columns(self, requests):
+        # Ambil lajur A:A, D:D, ... sahaja untuk semua dataset dalam satu values_batch_get, ikut susunan lajur dalam schema
         try:
-            df_clean = df.copy().fillna("").astype(str)
-            sheet = client.open(DB_NAME)
-            ws = sheet.worksheet(ws_name)
-            ws.clear()
-            ws.update(range_name="A1", values=[df_clean.columns.values.tolist()] + df_clean.values.tolist())
+            letters = [gspread.utils.rowcol_to_a1(1, list(schema).index(c) + 1)[:-1] for (name, schema), columns in requests for c in columns]
+            names = [name for (name, schema), columns in requests for c in columns]
+            ranges = [f"'{name}'!{letter}:{letter}" for name, letter in zip(names, letters)]
+            resp = self._read("values_batch_get", self._sheet().values_batch_get, ranges, params={"majorDimension": "COLUMNS"})
+            col_values = [(value_range.get("values") or [[]])[0] for value_range in resp.get("valueRanges", [])]
         except Exception as e:
+            self.spreadsheet = None
+            return super().load_columns(requests)
+
+        frames, fallback = [], []
+        for spec, columns in requests:
+            name, schema = spec
+            mine, col_values = col_values[:len(columns)], col_values[len(columns):]
+            # Header lain dari jangkaan (lajur disusun semula dalam sheet) -- guna load penuh
+            if [col[:1] for col in mine] != [[c] for c in columns]:
+                frames.append(None)
+                fallback.append((spec, columns))
+                continue
+            height = max(len(col) for col in mine)
+            values = [list(row) for row in zip(*[col + [""] * (height - len(col)) for col in mine])]
+            frames.append(build_frame(values, {c: schema[c] for c in columns})[0])
+        if fallback:
+            loaded = iter(super().load_columns(fallback))
+            frames = [next(loaded) if df is None else df for df in frames]
+        return frames
+
+    def save(self, ws_name, df, rows=None, delay=None):
+        if rows is not None:
+            # Tampal baris yang disunting atas nilai terkini, tanpa serialize semula seluruh frame
+            values = self.writer.latest(ws_name)
+            if values is not None and values[0] == list(df.columns) and len(values) == len(df) + 1:
+                values = list(values)
+                for pos, row in zip(rows, to_sheet_values(df.iloc[rows])[1:]):
+                    values[pos + 1] = row
+                self.writer.submit(ws_name, values, delay)
+                return
+        # Frame kosong hanya ditulis bila kita tahu isi sheet (elak padam data bila load gagal)
+        if not df.empty or self.writer.knows(ws_name):
+            self.writer.submit(ws_name, to_sheet_values(df), delay)
+
+    def status(self):
+        return self.writer.status()
+
+    def retry_failed(self):
+        self.writer.retry_failed()
+
+    def flush(self):
+        self.writer.flush()
+
+    def metrics(self):
+        return self.scheduler.metrics()
+
+class SQLiteBackend(StorageBackend):
+    label = "💾 Using local SQLite database"
+    # Lajur yang selalu ditapis / diisih, diindeks dalam setiap jadual
+    INDEXES = {"To_Do_List": ["Deadline"], "Scholarships": ["Due Date"], "CGPA": ["Semester"], "Assignments": ["Due Date"], "Finances": ["Date", "Category"], "Schedule": ["Day"]}
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.failed = {}  # ws_name -> (values, error)
+
+    @staticmethod
+    def quote(name):
+        return '"' + name.replace('"', '""') + '"'
+
+    def _ensure_table(self, ws_name, cols):
+        table = self.quote(ws_name)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (_row INTEGER PRIMARY KEY)")
+        existing = [info[1] for info in self.conn.execute(f"PRAGMA table_info({table})")]
+        for c in cols:
+            if c not in existing:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {self.quote(c)} TEXT NOT NULL DEFAULT ''")
+        for c in self.INDEXES.get(ws_name, []):
+            if c in cols:
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {self.quote(f'ix_{ws_name}_{c}')} ON {table} ({self.quote(c)})")
+
+    def load_all(self, specs):
+        raw = {}
+        with self.lock, self.conn:
+            for name, schema in specs:
+                self._ensure_table(name, list(schema))
+                rows = self.conn.execute(f"SELECT {', '.join(self.quote(c) for c in schema)} FROM {self.quote(name)} ORDER BY _row").fetchall()
+                raw[name] = [list(schema)] + [list(row) for row in rows]
+        return {name: build_frame(raw[name], schema)[0] for name, schema in specs}
+
+    def load_columns(self, requests):
+        frames = []
+        with self.lock, self.conn:
+            for (name, schema), columns in requests:
+                self._ensure_table(name, list(schema))
+                rows = self.conn.execute(f"SELECT {', '.join(self.quote(c) for c in columns)} FROM {self.quote(name)} ORDER BY _row").fetchall()
+                frames.append(build_frame([columns] + [list(row) for row in rows], {c: schema[c] for c in columns})[0])
+        return frames
+
+    def revision(self):
+        # data_version hanya berubah bila connection lain commit, bukan tulisan kita sendiri
+        with self.lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _write(self, ws_name, values):
+        header, rows = values[0], values[1:]
+        table = self.quote(ws_name)
+        # Satu transaksi: sama ada semua baris baru masuk, atau jadual kekal seperti asal
+        with self.lock, self.conn:
+            self._ensure_table(ws_name, header)
+            self.conn.execute(f"DELETE FROM {table}")
+            # _row = kedudukan baris + 1, jadi save(rows=...) boleh UPDATE terus ikut kedudukan
+            self.conn.executemany(f"INSERT INTO {table} (_row, {', '.join(self.quote(c) for c in header)}) VALUES (?, {', '.join('?' * len(header))})", [[i + 1] + row for i, row in enumerate(rows)])
+
+    def _patch(self, ws_name, df, rows):
+        values = to_sheet_values(df.iloc[rows])
+        header, table = values[0], self.quote(ws_name)
+        with self.lock, self.conn:
+            if self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] != len(df):
+                return False
+            self.conn.executemany(f"UPDATE {table} SET {', '.join(f'{self.quote(c)} = ?' for c in header)} WHERE _row = ?", [row + [pos + 1] for pos, row in zip(rows, values[1:])])
+        return True
+
+    def save(self, ws_name, df, rows=None, delay=None):
+        try:
+            if rows is not None and self._patch(ws_name, df, rows):
+                self.failed.pop(ws_name, None)
+                return
+        except sqlite3.Error as e:
             pass
+        values = to_sheet_values(df)
+        try:
+            self._write(ws_name, values)
+            self.failed.pop(ws_name, None)
+        except sqlite3.Error as e:
+            self.failed[ws_name] = (values, f"{type(e).__name__}: {e}")
+
+    def status(self):
+        return [], {ws_name: error for ws_name, (values, error) in self.failed.items()}
+
+    def retry_failed(self):
+        for ws_name, (values, error) in list(self.failed.items()):
+            try:
+                self._write(ws_name, values)
+                del self.failed[ws_name]
+            except sqlite3.Error as e:
+                self.failed[ws_name] = (values, f"{type(e).__name__}: {e}")
+
+@st.cache_resource
+def init_storage():
+    # Google Sheets bila ada credentials; SQLite tempatan bila diminta (storage_backend = "sqlite") atau tiada credentials
+    if client and st.secrets.get("storage_backend", "gsheets") != "sqlite":
+        backend = GSheetsBackend(client, int(st.secrets.get("sheets_quota_per_minute", 60)))
+    else:
+        backend = SQLiteBackend(st.secrets.get("sqlite_path", "student_tracker.db"))
+    atexit.register(backend.flush)
+    return backend
+
+storage = init_storage()
+
+class SharedFrames:
+    # Frame yang dikongsi semua sesi dalam proses ini. Satu fetch untuk semua tab/peranti;
+    # dibuang bila revision storage berubah, dan dikemaskini terus bila sesi tempatan menyimpan.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.revision = None
+        self.frames = {}    # ws_name -> DataFrame
+        self.views = {}     # (ws_name, columns) -> DataFrame dengan sebahagian lajur sahaja
+        self.versions = {}  # ws_name -> int, naik setiap kali frame berubah
+        self.loading = {}   # (ws_name, columns atau None) -> Event, fetch yang sedang berjalan
+
+    def check(self, revision):
+        with self.lock:
+            if revision != self.revision:
+                self.revision = revision
+                self.frames.clear()
+                self.views.clear()
+                for ws_name in self.versions:
+                    self.versions[ws_name] += 1
+
+    def version(self, ws_name):
+        with self.lock:
+            return self.versions.get(ws_name, 0)
+
+    def _load(self, items, key, have, fetch, publish, collect):
+        # Single-flight ikut worksheet: key yang hilang didaftar dengan Event, fetch berjalan tanpa lock,
+        # dan lock diambil semula hanya untuk terbitkan hasil. Sesi lain yang perlukan key sama tunggu Event itu;
+        # version() / check() / put() tak pernah menunggu fetch.
+        while True:
+            with self.lock:
+                missing = [item for item in items if not have(item)]
+                if not missing:
+                    return collect()
+                waits = {self.loading[key(item)] for item in missing if key(item) in self.loading}
+                mine = [item for item in missing if key(item) not in self.loading]
+                # Versi didaftar di sini supaya check() menaikkannya juga untuk sheet yang belum pernah dimuat
+                started = {key(item): self.versions.setdefault(key(item)[0], 0) for item in mine}
+                done = threading.Event()
+                for item in mine:
+                    self.loading[key(item)] = done
+            if mine:
+                try:
+                    result = fetch(mine)
+                    with self.lock:
+                        # Sheet yang berubah semasa fetch (put / revision baru) tak ditimpa dengan data lama
+                        publish(mine, result, [i for i, item in enumerate(mine) if self.versions[key(item)[0]] == started[key(item)]])
+                finally:
+                    with self.lock:
+                        for item in mine:
+                            self.loading.pop(key(item), None)
+                    done.set()
+            for event in waits:
+                event.wait()
+
+    def get(self, specs):
+        return self._load(
+            specs, lambda spec: (spec[0], None), lambda spec: spec[0] in self.frames, storage.load_all,
+            lambda mine, frames, fresh: self.frames.update({mine[i][0]: frames[mine[i][0]] for i in fresh}),
+            lambda: {name: (self.frames[name].copy(), self.versions[name]) for name, schema in specs})
+
+    def get_columns(self, requests):
+        # Frame penuh dah ada? Potong sahaja. Kalau tiada, baca lajur yang diminta sahaja (satu batch).
+        view_key = lambda request: (request[0][0], tuple(request[1]))
+        return self._load(
+            requests, view_key, lambda request: request[0][0] in self.frames or view_key(request) in self.views, storage.load_columns,
+            lambda mine, frames, fresh: self.views.update({view_key(mine[i]): frames[i] for i in fresh}),
+            lambda: [(self.frames[spec[0]][columns] if spec[0] in self.frames else self.views[view_key((spec, columns))]).copy() for spec, columns in requests])
+
+    def put(self, ws_name, df):
+        with self.lock:
+            self.frames[ws_name] = df.copy()
+            self.views = {key: view for key, view in self.views.items() if key[0] != ws_name}
+            self.versions[ws_name] = self.versions.get(ws_name, 0) + 1
+            return self.versions[ws_name]
+
+@st.cache_resource
+def init_shared_frames():
+    return SharedFrames()
+
+shared = init_shared_frames()
+
+if '_versions' not in st.session_state:
+    st.session_state._versions = {}
+
+def load_all(specs):
+    started = time.perf_counter()
+    frames = {}
+    for name, (df, version) in shared.get(specs).items():
+        frames[name] = df
+        st.session_state._versions[name] = version
+    trace("load", f"load_data {'+'.join(frames)}", started, frames.values())
+    return frames
+
+def load_data(ws_name, schema):
+    return load_all([(ws_name, schema)])[ws_name]
+
+def save_data(ws_name, df, rows=None, delay=None):
+    started = time.perf_counter()
+    storage.save(ws_name, df, rows, delay)
+    st.session_state._versions[ws_name] = shared.put(ws_name, df)
+    trace("save", f"save_data {ws_name}", started, [df], patched_rows=None if rows is None else len(rows))
 
 # --- INITIALIZE SEMUA DATABASE ---
-if 'tasks' not in st.session_state:
-    st.session_state.tasks = load_data("To_Do_List", ["Status", "Task", "Subject", "Deadline", "Priority", "Notes"], bool_cols=["Status"])
-if 'scholarships' not in st.session_state:
-    st.session_state.scholarships = load_data("Scholarships", ["Scholarship Name", "Bond", "Due Date", "App Status", "Result"])
-if 'cgpa_data' not in st.session_state:
-    st.session_state.cgpa_data = load_data("CGPA", ["Semester", "Code", "Subject", "Credit", "Grade", "Pointer"], float_cols=["Pointer"], bool_cols=[])
-    if not st.session_state.cgpa_data.empty:
-        st.session_state.cgpa_data['Credit'] = pd.to_numeric(st.session_state.cgpa_data['Credit'], errors='coerce').fillna(0).astype(int)
+grade_map = {"A+": 4.00, "A": 4.00, "A-": 3.67, "B+": 3.33, "B": 3.00, "B-": 2.67, "C+": 2.33, "C": 2.00, "C-": 1.67, "D+": 1.33, "D": 1.00, "D-": 0.67, "E": 0.00}
+
+# Pilihan tetap yang dikongsi oleh borang dan schema (jadi Categorical semasa load)
+PRIORITIES = ["High", "Medium", "Low"]
+TXN_TYPES = ["Income", "Expense"]
+FIN_CATEGORIES = ["Food", "Business", "Transport", "Study Materials", "Personal", "Others"]
+PROJECT_STATUSES = ["Not Started", "In Progress", "Completed"]
+BOND_OPTIONS = ["Yes", "No", "Unsure"]
+APP_STATUSES = ["Not Started", "In Progress", "Application Submitted"]
+RESULT_STATUSES = ["Pending Result", "Interview Stage", "Successful", "Unsuccessful"]
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+SEMESTERS = ["Semester 1", "Semester 2", "Semester 3", "Semester 4", "Semester 5", "Semester 6", "Semester 7", "Semester 8"]
+
+# session key -> (worksheet, {lajur: "str" | "bool" | "int" | "float" | "date" | [pilihan]})
+SHEETS = {
+    "tasks": ("To_Do_List", {"Status": "bool", "Task": "str", "Subject": "str", "Deadline": "date", "Priority": PRIORITIES, "Notes": "str"}),
+    "scholarships": ("Scholarships", {"Scholarship Name": "str", "Bond": BOND_OPTIONS, "Due Date": "date", "App Status": APP_STATUSES, "Result": RESULT_STATUSES}),
+    "cgpa_data": ("CGPA", {"Semester": SEMESTERS, "Code": "str", "Subject": "str", "Credit": "int", "Grade": list(grade_map), "Pointer": "float"}),
+    "sem_targets": ("Targets", {"Semester": "str", "Subjects": "int", "Credits": "int"}),
+    "assignments": ("Assignments", {"Project Name": "str", "Subject": "str", "Team Members": "str", "Status": PROJECT_STATUSES, "Due Date": "date"}),
+    "finances": ("Finances", {"Date": "date", "Type": TXN_TYPES, "Category": FIN_CATEGORIES, "Amount": "float", "Description": "str"}),
+    "schedule": ("Schedule", {"Day": WEEKDAYS, "Time": "str", "Subject": "str", "Location": "str"}),
+    "budgets": ("Budgets", {"Category": FIN_CATEGORIES, "Limit": "float"}),
+    # Nota disimpan sebagai bahagian berturutan; Scratchpad kecil berasingan supaya dashboard tak muat Notes
+    "scratchpad": ("Scratchpad", {"Part": "int", "Text": "str"}),
+    "notes": ("Notes", {"Part": "int", "Text": "str"}),
+}
 
-if 'sem_targets' not in st.session_state:
-    df_targets = load_data("Targets", ["Semester", "Subjects", "Credits"])
+def targets_from_frame(df_targets):
     targets_dict = {}
     if not df_targets.empty:
         for idx, row in df_targets.iterrows():
@@ -116,33 +874,684 @@ if 'sem_targets' not in st.session_state:
                     targets_dict[sem] = {"subjects": sub, "credits": cred}
                 except ValueError:
                     pass
-    st.session_state.sem_targets = targets_dict
+    return targets_dict
+
+def targets_to_frame(sem_targets):
+    rows = [{"Semester": sem, "Subjects": t["subjects"], "Credits": t["credits"]} for sem, t in sem_targets.items()]
+    return pd.DataFrame(rows, columns=list(SHEETS["sem_targets"][1]))
+
+def finish_frame(key, df):
+    if key == "sem_targets":
+        df = targets_from_frame(df)
+    return df
+
+# --- AGGREGATE STORE ---
+# Lajur yang diperlukan untuk membina semula jumlah setiap dataset
+AGG_COLUMNS = {"tasks": ["Status", "Priority"], "finances": ["Date", "Type", "Category", "Amount"], "cgpa_data": ["Semester", "Credit", "Pointer"]}
+
+def aggregate_rows(key, df):
+    # Sumbangan sekumpulan baris kepada jumlah dashboard; tambah untuk baris baru, tolak untuk baris dibuang
+    totals = Counter({"rows": len(df)})
+    if key == "tasks":
+        pending = df[~df["Status"].astype(bool)]
+        totals["pending"] = len(pending)
+        totals.update({("priority", p): n for p, n in pending["Priority"].value_counts().items() if n})
+    elif key == "finances":
+        totals.update({("type", t): v for t, v in df.groupby("Type", observed=True)["Amount"].sum().items()})
+        expenses = df[df["Type"] == "Expense"]
+        totals.update({("expense", c): v for c, v in expenses.groupby("Category", observed=True)["Amount"].sum().items()})
+        # Rollup ikut masa: bulan / hari x jenis x kategori (baki berjalan dan paparan harian per kategori)
+        totals.update({("month", m, t, c): v for (m, t, c), v in df.groupby([df["Date"].dt.strftime("%Y-%m"), "Type", "Category"], observed=True)["Amount"].sum().items()})
+        totals.update({("day", d, t, c): v for (d, t, c), v in df.groupby([df["Date"].dt.normalize(), "Type", "Category"], observed=True)["Amount"].sum().items()})
+    elif key == "cgpa_data":
+        points = df["Credit"] * df["Pointer"]
+        totals["credits"] = int(df["Credit"].sum())
+        totals["quality_points"] = float(points.sum())
+        by_sem = df.assign(Points=points).groupby("Semester", observed=True)
+        totals.update({("sem_subjects", sem): n for sem, n in by_sem.size().items()})
+        totals.update({("sem_credits", sem): int(v) for sem, v in by_sem["Credit"].sum().items()})
+        totals.update({("sem_points", sem): float(v) for sem, v in by_sem["Points"].sum().items()})
+    return totals
+
+class AggregateStore:
+    # Jumlah dashboard dikemaskini secara incremental oleh laluan tambah / edit / clear,
+    # jadi metrik dibaca terus (O(1)) dan tak dikira semula setiap rerun
+    def __init__(self):
+        self.totals = {}    # key -> Counter
+        self.versions = {}  # key -> versi dataset yang diwakili oleh jumlah ini
+
+    def fresh(self, key, version):
+        return key in self.totals and self.versions.get(key) == version
+
+    def rebuild(self, key, df, version):
+        self.totals[key] = aggregate_rows(key, df)
+        self.versions[key] = version
+
+    def apply(self, key, version, added=None, removed=None):
+        if added is not None and not added.empty:
+            self.totals[key].update(aggregate_rows(key, added))
+        if removed is not None and not removed.empty:
+            self.totals[key].subtract(aggregate_rows(key, removed))
+        self.versions[key] = version
+
+    def value(self, key, name):
+        return self.totals[key].get(name, 0)
+
+    def series(self, key, group):
+        return pd.Series({name[1]: v for name, v in self.totals[key].items() if isinstance(name, tuple) and name[0] == group and round(v, 6) != 0}, dtype=float)
+
+    def table(self, key, group, columns):
+        # Jumlah bertingkat seperti ("month", bulan, jenis, kategori) -> frame kecil, saiz ikut bilangan bucket
+        rows = [name[1:] + (v,) for name, v in self.totals[key].items() if isinstance(name, tuple) and name[0] == group and round(v, 6) != 0]
+        return pd.DataFrame(rows, columns=columns + ["Amount"])
+
+    def verify(self, key, df):
+        # Bina semula dari frame mentah dan bandingkan; pulangkan nama jumlah yang tak sepadan
+        expected = aggregate_rows(key, df)
+        names = set(expected) | set(self.totals.get(key, {}))
+        return sorted((str(name) for name in names if not np.isclose(expected.get(name, 0), self.totals.get(key, {}).get(name, 0))), key=str)
+
+if '_aggregates' not in st.session_state:
+    st.session_state._aggregates = AggregateStore()
+
+def dataset_version(key):
+    return shared.version(SHEETS[key][0])
+
+def aggregates_for(keys, views={}):
+    # Pastikan jumlah untuk keys sepadan dengan versi semasa; bina semula dari views yang diberi,
+    # atau dari projection AGG_COLUMNS bila tiada
+    agg = st.session_state._aggregates
+    stale = [key for key in keys if not agg.fresh(key, dataset_version(key))]
+    missing = {key: AGG_COLUMNS[key] for key in stale if key not in views}
+    fetched = dataset_views(missing) if missing else {}
+    for key in stale:
+        agg.rebuild(key, views[key] if key in views else fetched[key], dataset_version(key))
+    return agg
+
+def commit_dataset(key, df, added=None, removed=None, rows=None, delay=None):
+    # Satu laluan untuk semua perubahan dataset: state sesi, jumlah incremental, dan simpanan
+    agg = st.session_state._aggregates
+    was_fresh = key in AGG_COLUMNS and agg.fresh(key, dataset_version(key))
+    st.session_state[key] = df
+    save_data(SHEETS[key][0], df, rows, delay)
+    if key in AGG_COLUMNS:
+        if was_fresh and (added is not None or removed is not None):
+            agg.apply(key, dataset_version(key), added, removed)
+        else:
+            agg.rebuild(key, df, dataset_version(key))
+
+# --- FINANCE ROLLUPS & BUDGET ---
+# Semua dibaca dari bucket dalam AggregateStore, bukan imbas semula setiap transaksi
+def monthly_cashflow(agg):
+    monthly = agg.table("finances", "month", ["Month", "Type", "Category"])
+    return monthly.pivot_table(index="Month", columns="Type", values="Amount", aggfunc="sum", fill_value=0, observed=True).reindex(columns=TXN_TYPES, fill_value=0).sort_index()
+
+def running_balance(agg):
+    daily = agg.table("finances", "day", ["Date", "Type", "Category"])
+    signed = daily["Amount"].where(daily["Type"] == "Income", -daily["Amount"])
+    return signed.groupby(daily["Date"]).sum().sort_index().cumsum().rename("Balance")
+
+def month_expenses(agg, month):
+    monthly = agg.table("finances", "month", ["Month", "Type", "Category"])
+    spent = monthly[(monthly["Month"] == month) & (monthly["Type"] == "Expense")]
+    return spent.groupby("Category")["Amount"].sum()
+
+def budget_status(agg, budgets, month):
+    # Had bulanan per kategori berbanding perbelanjaan bulan itu
+    spent = month_expenses(agg, month)
+    status = pd.DataFrame({"Category": budgets["Category"].astype(str), "Limit": budgets["Limit"].fillna(0)})
+    status["Spent"] = status["Category"].map(spent).fillna(0.0)
+    status["Used"] = np.where(status["Limit"] > 0, status["Spent"] / status["Limit"].where(status["Limit"] > 0, 1), 0.0)
+    return status.reset_index(drop=True)
+
+def budget_alerts(status):
+    for cat, spent, limit, used in zip(status["Category"], status["Spent"], status["Limit"], status["Used"]):
+        if used >= 1:
+            st.error(f"🚨 **{cat}** budget exceeded: RM {spent:.2f} of RM {limit:.2f} this month.")
+        elif used >= 0.8:
+            st.warning(f"⚠️ **{cat}** is at {used:.0%} of its RM {limit:.2f} budget this month.")
+
+# --- CGPA ENGINE ---
+# Kredit dan mata nilaian per semester dari AggregateStore (dikemaskini semasa tambah subjek / reset semester)
+# Gred ikut mata nilaian x100 menaik; A+ dan A sama nilai, label "A" dikekalkan
+GRADE_STEPS = sorted({round(p * 100): g for g, p in grade_map.items()}.items())
+
+def semester_summary(agg):
+    subjects = agg.series("cgpa_data", "sem_subjects")
+    order = [sem for sem in SEMESTERS if sem in subjects.index] + sorted(set(subjects.index) - set(SEMESTERS))
+    summary = pd.DataFrame({"Subjects": subjects, "Credits": agg.series("cgpa_data", "sem_credits"), "Quality Points": agg.series("cgpa_data", "sem_points")}).reindex(order).fillna(0)
+    summary["GPA"] = np.where(summary["Credits"] > 0, summary["Quality Points"] / summary["Credits"].where(summary["Credits"] > 0, 1), 0.0)
+    return summary
+
+def remaining_subjects(agg, sem_targets):
+    # Subjek yang belum direkod ikut sasaran semester; kredit berbaki dibahagi sama rata antara subjek itu
+    remaining = []
+    for sem, target in sem_targets.items():
+        left = target["subjects"] - int(agg.value("cgpa_data", ("sem_subjects", sem)))
+        credits_left = target["credits"] - int(agg.value("cgpa_data", ("sem_credits", sem)))
+        if left > 0 and credits_left > 0:
+            base, extra = divmod(credits_left, left)
+            remaining += [(f"{sem} - subject {i + 1}", base + (i < extra)) for i in range(left) if base + (i < extra) > 0]
+    return remaining
+
+def grade_dp(credits, allowed):
+    # reachable[s] = jumlah mata nilaian s (x100) boleh dicapai dengan subjek setakat ini;
+    # choices[k][s] = gred subjek k yang membawa ke s. Kos O(subjek x gred x jumlah), bukan gred^subjek
+    steps = [GRADE_STEPS[i][0] for i in allowed]
+    size = max(steps) * sum(credits) + 1
+    reachable = np.zeros(size, dtype=bool)
+    reachable[0] = True
+    choices = []
+    for credit in credits:
+        nxt = np.zeros(size, dtype=bool)
+        pick = np.full(size, -1, dtype=np.int8)
+        for i, p in zip(allowed, steps):
+            # Gred rendah dulu: setiap jumlah ingat gred paling rendah yang mencapainya
+            shift = p * credit
+            src = reachable[:size - shift]
+            pick[shift:][src & ~nxt[shift:]] = i
+            nxt[shift:] |= src
+        reachable = nxt
+        choices.append(pick)
+    return reachable, choices
+
+@st.cache_data(max_entries=64)
+def solve_grades(credits, needed):
+    # Gred seragam terendah yang cukup, kemudian DP atas gred itu dan gred di bawahnya untuk cari
+    # campuran yang mencapai sasaran dengan lebihan paling sedikit. Pulang (gred seragam, gred per subjek) atau None
+    needed = max(needed, 0)
+    top = next((k for k, (p, _) in enumerate(GRADE_STEPS) if p * sum(credits) >= needed), None)
+    if top is None:
+        return None
+    reachable, choices = grade_dp(credits, range(max(top - 1, 0), top + 1))
+    total = needed + int(np.flatnonzero(reachable[needed:])[0])
+    grades = []
+    for credit, pick in zip(reversed(credits), reversed(choices)):
+        i = pick[total]
+        grades.append(GRADE_STEPS[i][1])
+        total -= GRADE_STEPS[i][0] * credit
+    return GRADE_STEPS[top][1], grades[::-1]
+
+if '_editor_changes' not in st.session_state:
+    st.session_state._editor_changes = {}
+
+def apply_editor_delta(key, editor_key, shown=None, track_changes=False):
+    # on_change st.data_editor: guna delta edited/added/deleted rows, bukan salin + .equals() seluruh frame.
+    # Kos ikut saiz suntingan; track_changes=True simpan (before, after) dalam _editor_changes[key] untuk page
+    # yang membacanya (dan pop selepas guna) -- page lain tak perlu simpan salinan baris.
+    # shown = kedudukan baris frame yang dipaparkan bila editor hanya tunjuk satu halaman / hasil tapisan
+    delta = st.session_state[editor_key]
+    schema = SHEETS[key][1]
+    df = st.session_state[key]
+    frame_pos = (lambda pos: int(shown[int(pos)])) if shown is not None else int
+    edited = {frame_pos(pos): {c: v for c, v in changes.items() if c in schema} for pos, changes in delta.get("edited_rows", {}).items()}
+    positions = sorted(pos for pos, changes in edited.items() if changes)
+    before = df.iloc[positions].copy()
+    for c in {c for pos in positions for c in edited[pos]}:
+        rows = [pos for pos in positions if c in edited[pos]]
+        values = coerce_column(pd.Series([edited[pos][c] for pos in rows]), schema[c])
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            new_categories = sorted(set(values.dropna()) - set(df[c].cat.categories))
+            if new_categories:
+                df[c] = df[c].cat.add_categories(new_categories)
+            values = values.astype(object)
+        df.iloc[rows, df.columns.get_loc(c)] = values.to_numpy()
+    after = df.iloc[positions]
+
+    added_rows, deleted = delta.get("added_rows", []), sorted(frame_pos(pos) for pos in delta.get("deleted_rows", []))
+    if added_rows or deleted:
+        added = apply_schema(pd.DataFrame(added_rows), schema)
+        removed = pd.concat([before, df.iloc[deleted]])
+        kept = df.drop(index=df.index[deleted])
+        commit_dataset(key, apply_schema(pd.concat([kept, added], ignore_index=True), schema), added=pd.concat([after, added]), removed=removed)
+    elif positions:
+        commit_dataset(key, df, added=after, removed=before, rows=positions)
+    if track_changes:
+        st.session_state._editor_changes[key] = (before, after)
+
+def add_record(key, record):
+    # Rekod baru dari borang ikut dtype schema, supaya frame kekal bertaip selepas concat
+    schema = SHEETS[key][1]
+    new_row = apply_schema(pd.DataFrame([record]), schema)
+    commit_dataset(key, apply_schema(pd.concat([st.session_state[key], new_row], ignore_index=True), schema), added=new_row)
+
+# --- BULK IMPORT ---
+# Fail CSV / Excel dibaca ikut chunk, disemak ikut schema, dedupe dengan hash, kemudian satu concat
+# dan satu commit_dataset -- sync_sheet hantar semua baris baru dalam satu append_rows
+IMPORT_CHUNK = 5000
+IMPORT_REQUIRED = {"tasks": ["Task"], "finances": ["Date", "Amount"], "cgpa_data": ["Semester", "Subject", "Credit", "Grade"]}
+IMPORT_DEFAULTS = {"tasks": {"Status": False, "Priority": "Medium"}, "finances": {"Category": "Others"}, "cgpa_data": {}}
+IMPORT_DERIVED = {"cgpa_data": ["Pointer"]}
+# Nama lajur biasa dalam penyata bank / export lain (huruf kecil, tanpa simbol)
+IMPORT_ALIASES = {
+    "Date": ["transactiondate", "txndate", "postingdate", "valuedate"],
+    "Description": ["details", "narration", "particulars", "reference", "transactiondescription"],
+    "Amount": ["amountrm", "value", "transactionamount"],
+    "Deadline": ["due", "duedate"],
+    "Task": ["taskname", "title"],
+    "Subject": ["course", "coursename", "subjectname"],
+    "Code": ["coursecode", "subjectcode"],
+    "Credit": ["credits", "credithours"],
+}
+# Nilai tanda (Status) yang biasa dalam export lain
+IMPORT_BOOLS = {**dict.fromkeys(["true", "yes", "y", "1", "1.0", "done", "completed", "complete", "x"], True),
+                **dict.fromkeys(["false", "no", "n", "0", "0.0", "pending", "todo", "not done", "incomplete"], False)}
+# Satu format tarikh untuk seluruh lajur (format="mixed" baca 05/01 sebagai 1 Mei); hari-dulu dicuba sebelum bulan-dulu
+IMPORT_DATE_FORMATS = {
+    "YYYY-MM-DD": "ISO8601", "DD/MM/YYYY": "%d/%m/%Y", "DD-MM-YYYY": "%d-%m-%Y", "DD.MM.YYYY": "%d.%m.%Y",
+    "DD/MM/YY": "%d/%m/%y", "DD MMM YYYY": "%d %b %Y", "DD-MMM-YYYY": "%d-%b-%Y", "MM/DD/YYYY": "%m/%d/%Y",
+}
+
+def normalize_name(name):
+    return "".join(ch for ch in str(name).lower() if ch.isalnum())
+
+def match_column(field, columns):
+    names = {normalize_name(field), *IMPORT_ALIASES.get(field, [])}
+    return next((c for c in columns if normalize_name(c) in names), None)
+
+def read_upload(upload, header_only=False):
+    # Pulang iterator chunk (semua nilai sebagai teks); CSV distrim, Excel dibaca sekali kemudian dipotong
+    upload.seek(0)
+    if upload.name.lower().endswith(".xlsx"):
+        df = pd.read_excel(upload, dtype=str, nrows=0 if header_only else None)
+        return iter([df]) if header_only else (df.iloc[i:i + IMPORT_CHUNK] for i in range(0, len(df), IMPORT_CHUNK))
+    if header_only:
+        return iter([pd.read_csv(upload, dtype=str, nrows=0, skipinitialspace=True)])
+    return pd.read_csv(upload, dtype=str, chunksize=IMPORT_CHUNK, skipinitialspace=True)
+
+def detect_date_format(values):
+    # Format yang berjaya baca paling banyak nilai; seri dipecahkan ikut susunan IMPORT_DATE_FORMATS
+    values = values.dropna().str.strip()
+    values = values[values != ""]
+    scores = {label: pd.to_datetime(values, format=fmt, errors="coerce").notna().sum() for label, fmt in IMPORT_DATE_FORMATS.items()}
+    return max(scores, key=scores.get)
+
+def row_hashes(df):
+    # Hash ikut nilai yang ditulis ke sheet, jadi baris import dan baris sedia ada boleh dibandingkan
+    header, *rows = to_sheet_values(df)
+    return pd.util.hash_pandas_object(pd.DataFrame(rows, columns=header), index=False).to_numpy()
+
+def prepare_chunk(key, chunk, mapping, date_formats):
+    # Chunk mentah -> (frame bertaip ikut schema, bilangan baris tak sah); date_formats: lajur -> label IMPORT_DATE_FORMATS
+    schema = SHEETS[key][1]
+    raw = chunk[list(mapping.values())].set_axis(list(mapping), axis=1)
+    raw = raw.apply(lambda col: col.str.strip())
+    for col in raw:
+        if schema[col] in ("int", "float"):
+            raw[col] = raw[col].str.replace(",", "", regex=False)
+    if key == "finances":
+        # Penyata bank: amaun bertanda -> Income / Expense bila Type tiada; amaun sentiasa disimpan positif seperti borang
+        amount = pd.to_numeric(raw["Amount"], errors="coerce")
+        if "Type" not in mapping:
+            raw["Type"] = np.where(amount < 0, "Expense", "Income")
+        raw["Amount"] = amount.abs().astype(str)
+
+    present = raw.notna() & (raw != "")
+    valid = present[IMPORT_REQUIRED[key]].all(axis=1)
+    for col in raw:
+        kind = schema[col]
+        if kind in ("int", "float"):
+            valid &= ~present[col] | pd.to_numeric(raw[col], errors="coerce").notna()
+        elif kind == "date":
+            raw[col] = pd.to_datetime(raw[col], format=IMPORT_DATE_FORMATS[date_formats[col]], errors="coerce")
+            valid &= ~present[col] | raw[col].notna()
+        elif kind == "bool":
+            # coerce_column("bool") cuma kenal "true"; nilai lain yang tak dikenali ditolak, bukan jadi False
+            flags = raw[col].str.lower().map(IMPORT_BOOLS)
+            valid &= ~present[col] | flags.notna()
+            raw[col] = flags.map({True: "True", False: "False"})
+        elif isinstance(kind, list):
+            valid &= ~present[col] | raw[col].isin(kind)
+    raw = raw[valid]
+    for col, default in IMPORT_DEFAULTS[key].items():
+        raw[col] = raw[col].where(present[col][valid], default) if col in raw else default
+    if key == "cgpa_data":
+        raw["Pointer"] = raw["Grade"].map(grade_map)
+    return apply_schema(raw.reindex(columns=list(schema)), schema), int((~valid).sum())
+
+def import_rows(key, upload, mapping, date_format=None):
+    # date_format None = kesan sekali setiap lajur dari chunk pertama yang ada nilai, kemudian guna untuk semua chunk
+    schema = SHEETS[key][1]
+    seen = set(row_hashes(st.session_state[key]))
+    parts, duplicates, invalid = [], 0, 0
+    date_cols = [col for col in mapping if schema[col] == "date"]
+    date_formats = {col: date_format for col in date_cols if date_format}
+    for chunk in read_upload(upload):
+        for col in date_cols:
+            if col not in date_formats and (chunk[mapping[col]].fillna("").str.strip() != "").any():
+                date_formats[col] = detect_date_format(chunk[mapping[col]])
+        df, bad = prepare_chunk(key, chunk, mapping, {col: date_formats.get(col, "YYYY-MM-DD") for col in date_cols})
+        invalid += bad
+        if df.empty:
+            continue
+        hashes = row_hashes(df)
+        keep = ~pd.Series(hashes).duplicated().to_numpy() & ~np.isin(hashes, list(seen))
+        duplicates += int((~keep).sum())
+        seen.update(hashes[keep])
+        parts.append(df[keep])
+    added = apply_schema(pd.concat(parts, ignore_index=True), schema) if parts else None
+    if added is not None and not added.empty:
+        commit_dataset(key, apply_schema(pd.concat([st.session_state[key], added], ignore_index=True), schema), added=added)
+    return 0 if added is None else len(added), duplicates, invalid, date_formats
+
+def bulk_import(key):
+    with st.expander("📥 Bulk Import (CSV / Excel)", expanded=False):
+        upload = st.file_uploader("Upload a .csv or .xlsx file", type=["csv", "xlsx"])
+        if upload is None:
+            return
+        try:
+            columns = list(next(read_upload(upload, header_only=True)).columns)
+        except (ValueError, ImportError) as e:
+            st.error(f"Could not read {upload.name}: {e}")
+            return
+        st.write("**Match file columns** (* required)")
+        fields = [c for c in SHEETS[key][1] if c not in IMPORT_DERIVED.get(key, [])]
+        mapping, map_cols = {}, st.columns(3)
+        for i, field in enumerate(fields):
+            guess = match_column(field, columns)
+            label = field + (" *" if field in IMPORT_REQUIRED[key] else "")
+            choice = map_cols[i % 3].selectbox(label, ["(skip)"] + columns, index=columns.index(guess) + 1 if guess else 0)
+            if choice != "(skip)":
+                mapping[field] = choice
+        date_format = None
+        if any(SHEETS[key][1][field] == "date" for field in mapping):
+            choice = st.selectbox("Date format", ["Auto-detect"] + list(IMPORT_DATE_FORMATS), help="Auto-detect picks one format per column, trying day-first before month-first.")
+            date_format = None if choice == "Auto-detect" else choice
+        missing = [c for c in IMPORT_REQUIRED[key] if c not in mapping]
+        if missing:
+            st.warning(f"Map a column for: {', '.join(missing)}")
+        elif st.button("Import Rows"):
+            with st.spinner("Importing..."):
+                added, duplicates, invalid, date_formats = import_rows(key, upload, mapping, date_format)
+            st.success(f"Imported {added} rows ({duplicates} duplicates and {invalid} invalid rows skipped).")
+            if date_formats:
+                st.caption("Dates read as " + ", ".join(f"{col}: {label}" for col, label in date_formats.items()))
+
+def check_revision():
+    # Semakan revision yang murah ganti reload penuh; tak refresh semasa ada tulisan belum sampai
+    pending_writes, failed_writes = storage.status()
+    if not pending_writes:
+        shared.check(storage.revision())
+
+def refresh_datasets(keys):
+    # Dipanggil oleh setiap page untuk dataset yang ia guna sahaja -- load pada akses pertama
+    check_revision()
+    versions = st.session_state._versions
+    stale = [key for key in keys if key not in st.session_state or versions.get(SHEETS[key][0]) != shared.version(SHEETS[key][0])]
+    if stale:
+        frames = load_all([SHEETS[key] for key in stale])
+        for key in stale:
+            st.session_state[key] = finish_frame(key, frames[SHEETS[key][0]])
+
+def dataset_views(requests):
+    # {key: columns} -> {key: frame} untuk paparan baca-sahaja (dashboard) tanpa load dataset penuh
+    views, missing = {}, []
+    for key, columns in requests.items():
+        if key in st.session_state and st.session_state._versions.get(SHEETS[key][0]) == shared.version(SHEETS[key][0]):
+            views[key] = st.session_state[key][columns]
+        else:
+            missing.append(key)
+    if missing:
+        started = time.perf_counter()
+        fetched = shared.get_columns([(SHEETS[key], requests[key]) for key in missing])
+        trace("load", f"load_data {'+'.join(SHEETS[key][0] for key in missing)} (columns)", started, fetched)
+        for key, df in zip(missing, fetched):
+            views[key] = finish_frame(key, df)
+    return views
 
-if 'assignments' not in st.session_state:
-    st.session_state.assignments = load_data("Assignments", ["Project Name", "Subject", "Team Members", "Status", "Due Date"])
-if 'finances' not in st.session_state:
-    st.session_state.finances = load_data("Finances", ["Date", "Type", "Category", "Amount", "Description"], float_cols=["Amount"])
-if 'schedule' not in st.session_state:
-    st.session_state.schedule = load_data("Schedule", ["Day", "Time", "Subject", "Location"])
+# Dataset yang setiap page perlukan; dashboard guna dataset_views dengan lajur terhad
+PAGE_DATASETS = {
+    "🏠 Main Dashboard": ["scratchpad"],
+    "📝 To-Do List": ["tasks"],
+    "👥 Project Manager": ["assignments"],
+    "💰 Financial Tracker": ["finances", "budgets"],
+    "📅 Class Schedule": ["schedule"],
+    "💡 Quick Notes": ["notes"],
+    "🎓 Scholarship Tracker": ["scholarships"],
+    "📊 CGPA Tracker": ["cgpa_data", "sem_targets"],
+}
 
 if 'exam_date' not in st.session_state:
     st.session_state.exam_date = datetime.date.today() + datetime.timedelta(days=60)
-if 'quick_notes' not in st.session_state:
-    st.session_state.quick_notes = "Jot down your sudden ideas or reminders here..."
 
-grade_map = {"A+": 4.00, "A": 4.00, "A-": 3.67, "B+": 3.33, "B": 3.00, "B-": 2.67, "C+": 2.33, "C": 2.00, "C-": 1.67, "D+": 1.33, "D": 1.00, "D-": 0.67, "E": 0.00}
+# --- NOTES ---
+NOTE_CHUNK = 40000   # had satu sel Google Sheets ialah 50k aksara
+NOTE_DEBOUNCE = 5    # saat; SheetWriter tangguh dan gabung simpanan, hanya teks terakhir dihantar
+NOTE_PLACEHOLDER = "Jot down your sudden ideas or reminders here..."
+
+def note_text(key):
+    df = st.session_state[key]
+    return "".join(df.sort_values("Part")["Text"]) if not df.empty else ""
+
+def save_note(key, text):
+    # Simpan hanya bila teks berubah; bila bilangan bahagian sama, tampal bahagian yang berubah sahaja
+    old = st.session_state[key]
+    parts = [text[i:i + NOTE_CHUNK] for i in range(0, len(text), NOTE_CHUNK)]
+    new = apply_schema(pd.DataFrame({"Part": range(1, len(parts) + 1), "Text": parts}), SHEETS[key][1])
+    if len(new) == len(old) and (old["Part"].to_numpy() == new["Part"].to_numpy()).all():
+        changed = np.flatnonzero(old["Text"].to_numpy() != new["Text"].to_numpy()).tolist()
+        if not changed:
+            return False
+        commit_dataset(key, new, rows=changed, delay=NOTE_DEBOUNCE)
+    else:
+        commit_dataset(key, new, delay=NOTE_DEBOUNCE)
+    return True
+
+# --- DEADLINE ENGINE ---
+URGENCY_LABELS = ["🚨 Overdue", "🔴 Urgent", "🟡 Soon", "🟢 Chill"]
+FOCUS_LIMIT = 8  # tugasan hari ini / 3 hari akan datang maksimum dalam Today's Focus
+
+def days_left(dates, today=None):
+    # Hari berbaki untuk seluruh lajur sekaligus; NaT kekal NaN
+    today = pd.Timestamp(today or datetime.date.today())
+    return (pd.to_datetime(dates, errors='coerce').dt.normalize() - today).dt.days.to_numpy(dtype=float)
+
+def urgency(days):
+    # NaN gagal semua perbandingan -> "Chill", sama macam tarikh yang tak boleh dibaca dulu
+    labels = np.select([days < 0, days <= 3, days <= 7], URGENCY_LABELS[:3], default=URGENCY_LABELS[3])
+    return pd.Categorical(labels, categories=URGENCY_LABELS)
+
+class DeadlineIndex:
+    # Tarikh akhir disusun sekali; "due dalam N hari" dan "overdue" jadi carian julat dengan searchsorted.
+    # Index yang sama digunakan untuk lajur Date dalam Finances (julat tarikh pada paparan berhalaman)
+    def __init__(self, dates, today=None):
+        days = days_left(dates, today)
+        valid = np.flatnonzero(~np.isnan(days))
+        order = np.argsort(days[valid], kind="stable")
+        self.positions = valid[order]
+        self.days = days[valid][order]
+        self.missing = np.flatnonzero(np.isnan(days))
+
+    def ordered(self):
+        # Semua baris ikut tarikh menaik; tarikh kosong di hujung
+        return np.concatenate([self.positions, self.missing])
+
+    def between(self, first_day, last_day):
+        lo = np.searchsorted(self.days, first_day, side="left")
+        hi = np.searchsorted(self.days, last_day, side="right")
+        return self.positions[lo:hi], self.days[lo:hi]
+
+    def overdue(self):
+        return self.between(-np.inf, -1)
+
+def deadline_index(key, df, date_col):
+    # Cache per sesi; dibina semula bila dataset berubah (versi) atau hari bertukar
+    token = (dataset_version(key), datetime.date.today(), len(df))
+    cache = st.session_state.setdefault("_deadline_index", {})
+    if key not in cache or cache[key][0] != token:
+        cache[key] = (token, DeadlineIndex(df[date_col]))
+    return cache[key][1]
+
+# --- FILTERED VIEWS ---
+# Sejarah Finances / To-Do ditapis dan dipotong dalam Python sebelum render,
+# jadi payload setiap rerun ikut saiz halaman, bukan saiz sejarah
+PAGE_SIZES = [25, 50, 100, 250]
+
+def date_range_filter(where, label, index):
+    # Lalai = seluruh julat data (tiada penapis); pulang (hari_mula, hari_akhir) relatif hari ini, atau None
+    if not index.days.size:
+        return None
+    today = datetime.date.today()
+    first, last = today + datetime.timedelta(days=int(index.days[0])), today + datetime.timedelta(days=int(index.days[-1]))
+    picked = where.date_input(label, value=(first, last), min_value=first, max_value=last)
+    if len(picked) != 2 or (picked[0] <= first and picked[1] >= last):
+        return None
+    return (picked[0] - today).days, (picked[1] - today).days
+
+def query_positions(df, index, day_range=None, choices={}, text="", text_cols=(), newest_first=False):
+    # Julat tarikh guna index tersusun (searchsorted); pilihan kategori dan carian teks
+    # hanya dinilai pada baris yang tinggal selepas itu
+    positions = index.between(*day_range)[0] if day_range else index.ordered()
+    if newest_first:
+        positions = positions[::-1]
+    for col, selected in choices.items():
+        if positions.size and selected:
+            positions = positions[df[col].iloc[positions].isin(selected).to_numpy()]
+    if positions.size and text:
+        hits = np.zeros(positions.size, dtype=bool)
+        for col in text_cols:
+            hits |= df[col].iloc[positions].astype(str).str.contains(text, case=False, regex=False, na=False).to_numpy()
+        positions = positions[hits]
+    return positions
+
+def paginate(positions):
+    # Pulang kedudukan baris untuk halaman semasa sahaja
+    c_size, c_page, c_info = st.columns([1, 1, 2])
+    page_size = c_size.selectbox("Rows per page", PAGE_SIZES)
+    pages = max(1, -(-len(positions) // page_size))
+    page = min(int(c_page.number_input("Page", min_value=1, max_value=pages, value=1, step=1)), pages)
+    start = (page - 1) * page_size
+    shown = positions[start:start + page_size]
+    c_info.caption(f"Showing {start + 1 if len(shown) else 0}–{start + len(shown)} of {len(positions)} (page {page}/{pages})")
+    return shown
+
+# --- TIMETABLE ENGINE ---
+# "10:00 AM - 12:00 PM", "10am-12pm", "14:00 - 16:00" -> minit dari tengah malam
+TIME_RANGE = r"^\s*(\d{1,2})(?:[:.](\d{2}))?\s*([AaPp][Mm])?\s*(?:-|–|to)\s*(\d{1,2})(?:[:.](\d{2}))?\s*([AaPp][Mm])?\s*$"
+
+def clock_minutes(hour, minute, meridiem):
+    hour = pd.to_numeric(hour, errors="coerce")
+    minute = pd.to_numeric(minute, errors="coerce").fillna(0)
+    meridiem = meridiem.fillna("").str.upper()
+    hour = hour.where((meridiem == "") | (hour <= 12))
+    hour = hour.where(meridiem == "", hour % 12 + (meridiem == "PM") * 12)
+    return (hour * 60 + minute).where((hour <= 24) & (minute < 60)).to_numpy(dtype=float)
+
+def parse_times(times):
+    # Seluruh lajur Time sekaligus -> (mula, tamat) dalam minit; NaN bila tak boleh dibaca
+    parts = pd.Series(times, dtype=object).astype(str).str.extract(TIME_RANGE)
+    start = clock_minutes(parts[0], parts[1], parts[2].fillna(parts[5]))
+    end = clock_minutes(parts[3], parts[4], parts[5])
+    # "10 - 12 PM": mula warisi PM -> 22:00, jadi undur ke pagi
+    inherited = (parts[2].isna() & parts[5].notna()).to_numpy() & (start >= end)
+    start = np.where(inherited, start - 720, start)
+    bad = ~(start < end)
+    return np.where(bad, np.nan, start), np.where(bad, np.nan, end)
+
+def format_minutes(minutes):
+    hour, minute = divmod(int(minutes), 60)
+    return f"{hour % 12 or 12}:{minute:02d} {'AM' if hour % 24 < 12 else 'PM'}"
+
+class TimetableIndex:
+    # Sesi setiap hari disusun ikut masa mula; max_end[i] = tamat terlewat bagi sesi 0..i (menaik),
+    # jadi sesi yang bertindih dengan [start, end) ialah satu julat searchsorted + tapisan kecil
+    def __init__(self, days, times):
+        start, end = parse_times(times)
+        days = pd.Series(days, dtype=object).astype(str).to_numpy()
+        valid = ~np.isnan(start)
+        self.unreadable = np.flatnonzero(~valid)
+        self.days = {}
+        for day in np.unique(days[valid]):
+            pos = np.flatnonzero(valid & (days == day))
+            pos = pos[np.argsort(start[pos], kind="stable")]
+            self.days[day] = (start[pos], end[pos], np.maximum.accumulate(end[pos]), pos)
+
+    def sessions(self, day):
+        starts, ends, max_end, pos = self.days.get(day, (np.array([]), np.array([]), np.array([]), np.array([], dtype=int)))
+        return starts, ends, pos
+
+    def overlapping(self, day, start, end):
+        if day not in self.days:
+            return np.array([], dtype=int)
+        starts, ends, max_end, pos = self.days[day]
+        lo = np.searchsorted(max_end, start, side="right")
+        hi = np.searchsorted(starts, end, side="left")
+        return pos[lo:hi][ends[lo:hi] > start]
+
+    def next_session(self, now=None):
+        # (tarikh, kedudukan baris, sedang berlangsung?) untuk kelas seterusnya dalam 7 hari, atau None
+        now = now or datetime.datetime.now()
+        minute = now.hour * 60 + now.minute
+        for offset in range(8):
+            date = now.date() + datetime.timedelta(days=offset)
+            starts, ends, pos = self.sessions(date.strftime("%A"))
+            later = np.flatnonzero(ends > minute) if offset == 0 else np.arange(len(pos))
+            if later.size:
+                i = later[0]
+                return date, pos[i], offset == 0 and starts[i] <= minute
+
+    def grid(self, subjects, days):
+        # Jadual mingguan: baris = slot sejam, lajur = hari
+        if not self.days:
+            return pd.DataFrame(columns=days)
+        first = int(min(v[0][0] for v in self.days.values()) // 60 * 60)
+        last = int(-(-max(v[2][-1] for v in self.days.values()) // 60) * 60)
+        slots = range(first, last, 60)
+        return pd.DataFrame({day: [" / ".join(subjects[self.overlapping(day, m, m + 60)]) for m in slots] for day in days}, index=[format_minutes(m) for m in slots])
+
+def timetable_index(df):
+    # Cache per sesi seperti deadline_index; dibina semula bila dataset Schedule berubah
+    token = (dataset_version("schedule"), len(df))
+    cached = st.session_state.get("_timetable_index")
+    if cached is None or cached[0] != token:
+        cached = st.session_state._timetable_index = (token, TimetableIndex(df["Day"], df["Time"]))
+    return cached[1]
+
+def describe_sessions(df, positions):
+    return ", ".join(f"{subject} ({time})" for subject, time in zip(df["Subject"].iloc[positions], df["Time"].iloc[positions]))
 
 # --- SIDEBAR & LOGO ---
+trace("phase", "startup", STARTUP_STARTED)
+SIDEBAR_STARTED = time.perf_counter()
 try: st.sidebar.image("logo_utm.png", use_container_width=True)
 except: pass 
 st.sidebar.title("Navigation Menu")
-page_selection = st.sidebar.radio("Go to:", ["🏠 Main Dashboard", "📝 To-Do List", "👥 Project Manager", "💰 Financial Tracker", "📅 Class Schedule", "💡 Quick Notes", "🎓 Scholarship Tracker", "📊 CGPA Tracker"])
+page_selection = st.sidebar.radio("Go to:", list(PAGE_DATASETS))
 
 st.sidebar.markdown("---")
+pending_writes, failed_writes = storage.status()
+if pending_writes:
+    st.sidebar.caption(f"⏳ Saving: {', '.join(pending_writes)}")
+for ws_name, error in failed_writes.items():
+    st.sidebar.error(f"⚠️ Could not save **{ws_name}**: {error}")
+if failed_writes and st.sidebar.button("🔁 Retry Failed Saves"):
+    storage.retry_failed()
+    st.rerun()
+if client is None and "google_json" in st.secrets:
+    st.sidebar.warning("Google Sheets credentials could not be loaded. Using the local database.")
+api_metrics = storage.metrics()
+if api_metrics:
+    with st.sidebar.expander("📡 Sheets API usage"):
+        st.dataframe(pd.DataFrame.from_dict(api_metrics, orient="index")[["calls", "errors", "retries", "deduped", "avg_ms", "max_ms", "throttled_ms"]].round(1), use_container_width=True)
 if st.sidebar.button("🚪 Log Keluar (Logout)"):
     st.session_state.logged_in = False
     st.rerun()
 
+def show_storage_error(e):
+    # Data gagal dimuat: berhenti di sini, jangan render (atau simpan) jadual kosong
+    st.error(f"⚠️ {e}")
+    st.button("🔄 Try Again")
+    st.stop()
+
+trace("phase", "sidebar", SIDEBAR_STARTED)
+DATASETS_STARTED = time.perf_counter()
+try:
+    refresh_datasets(PAGE_DATASETS[page_selection])
+except storage.Error as e:
+    show_storage_error(e)
+trace("phase", "dataset init", DATASETS_STARTED)
+PAGE_STARTED = time.perf_counter()
+
 # --- 1. MAIN DASHBOARD ---
 if page_selection == "🏠 Main Dashboard":
     col_header1, col_header2 = st.columns([3, 1])
@@ -164,63 +1573,82 @@ if page_selection == "🏠 Main Dashboard":
     st.info(f"💡 **Quote of the Day:**\n\n*{today_quote}*")
     st.markdown("---")
     
+    # Today's Focus perlukan baris tugasan; selebihnya dibaca dari AggregateStore (projection hanya bila jumlah basi)
+    agg = st.session_state._aggregates
+    try:
+        views = dataset_views({**{key: AGG_COLUMNS[key] for key in ("finances", "cgpa_data") if not agg.fresh(key, dataset_version(key))}, "tasks": ["Status", "Task", "Subject", "Deadline", "Priority"], "schedule": list(SHEETS["schedule"][1])})
+        aggregates_for(["tasks", "finances", "cgpa_data"], views)
+    except storage.Error as e:
+        show_storage_error(e)
+    tasks_view = views["tasks"]
+
     col1, col2, col3, col4 = st.columns(4)
-    pending_tasks = len(st.session_state.tasks[st.session_state.tasks["Status"] == False]) if not st.session_state.tasks.empty else 0
+    pending_tasks = agg.value("tasks", "pending")
     col1.metric("Pending Tasks", f"{pending_tasks} Tasks")
-    total_in = st.session_state.finances[st.session_state.finances["Type"] == "Income"]["Amount"].sum() if not st.session_state.finances.empty else 0
-    total_out = st.session_state.finances[st.session_state.finances["Type"] == "Expense"]["Amount"].sum() if not st.session_state.finances.empty else 0
+    total_in = agg.value("finances", ("type", "Income"))
+    total_out = agg.value("finances", ("type", "Expense"))
     col2.metric("Financial Balance", f"RM {(total_in - total_out):.2f}")
-    if not st.session_state.cgpa_data.empty:
-        df_all = st.session_state.cgpa_data
-        cgpa_val = (df_all['Credit'] * df_all['Pointer']).sum() / df_all['Credit'].sum() if df_all['Credit'].sum() > 0 else 0.0
-    else: cgpa_val = 0.0
+    total_credits = agg.value("cgpa_data", "credits")
+    cgpa_val = agg.value("cgpa_data", "quality_points") / total_credits if total_credits > 0 else 0.0
     col3.metric("Current CGPA", f"{cgpa_val:.2f}")
     days_to_exam = (st.session_state.exam_date - datetime.date.today()).days
     col4.metric("Exam Countdown", f"{days_to_exam} Days")
+    schedule_view = views["schedule"]
+    upcoming = timetable_index(schedule_view).next_session() if not schedule_view.empty else None
+    if upcoming:
+        class_date, pos, ongoing = upcoming
+        when = "Happening now" if ongoing else "Today" if class_date == datetime.date.today() else "Tomorrow" if class_date == datetime.date.today() + datetime.timedelta(days=1) else class_date.strftime("%A")
+        cls = schedule_view.iloc[pos]
+        st.info(f"🕒 **Next class:** {cls['Subject']} · {cls['Time']} · {cls['Location']} ({when})")
     st.markdown("---")
 
     col_g1, col_g2, col_g3 = st.columns([1, 1, 1.5])
     with col_g1:
         st.write("📊 **Task Priorities**")
-        if not st.session_state.tasks.empty:
-            pending_df = st.session_state.tasks[st.session_state.tasks["Status"] == False]
-            if not pending_df.empty: st.bar_chart(pending_df["Priority"].value_counts(), color="#88A2FF") 
+        if agg.value("tasks", "rows"):
+            if pending_tasks: st.bar_chart(agg.series("tasks", "priority"), color="#88A2FF") 
             else: st.write("All clear! 🎉")
         else: st.write("No tasks yet.")
     with col_g2:
         st.write("📈 **Cashflow (In vs Out)**")
-        if not st.session_state.finances.empty: st.bar_chart(st.session_state.finances.groupby("Type")["Amount"].sum(), color="#253A82")
+        if agg.value("finances", "rows"): st.bar_chart(agg.series("finances", "type"), color="#253A82")
         else: st.write("No data yet.")
     
     with col_g3:
         st.subheader("🔥 Today's Focus")
         st.write("Urgent tasks (due within 3 days):")
-        if not st.session_state.tasks.empty:
-            active_tasks = st.session_state.tasks[st.session_state.tasks["Status"] == False].copy()
-            active_tasks['Deadline_Date'] = pd.to_datetime(active_tasks['Deadline'], errors='coerce').dt.date
-            today_date = datetime.date.today()
-            active_tasks['Days Left'] = active_tasks['Deadline_Date'].apply(lambda x: (x - today_date).days if pd.notnull(x) else 99)
+        if not tasks_view.empty:
+            index = deadline_index("tasks", tasks_view, "Deadline")
+            pending = ~tasks_view["Status"].to_numpy(dtype=bool)
+            upcoming_pos, upcoming_days = index.between(0, 3)
+            overdue_pos, overdue_days = index.overdue()
+            upcoming_pos, upcoming_days = upcoming_pos[pending[upcoming_pos]], upcoming_days[pending[upcoming_pos]].astype(int)
+            overdue_pos, overdue_days = overdue_pos[pending[overdue_pos]], overdue_days[pending[overdue_pos]].astype(int)
             
-            urgent_tasks = active_tasks[active_tasks['Days Left'] <= 3]
-            
-            if not urgent_tasks.empty:
-                for index, row in urgent_tasks.iterrows():
-                    days_text = "Today!" if row['Days Left'] == 0 else f"{row['Days Left']} days left"
-                    if row['Days Left'] < 0: days_text = "OVERDUE 🚨"
-                    st.warning(f"**{row['Task']}** ({row['Subject']}) - {days_text}")
+            if upcoming_pos.size or overdue_pos.size:
+                # Hari ini & akan datang dulu (satu elemen setiap tugasan, dihadkan)
+                shown, days = tasks_view.iloc[upcoming_pos[:FOCUS_LIMIT]], upcoming_days[:FOCUS_LIMIT]
+                days_text = np.where(days == 0, "Today!", np.char.add(days.astype(str), " days left"))
+                for task, subject, text in zip(shown["Task"], shown["Subject"], days_text):
+                    st.warning(f"**{task}** ({subject}) - {text}")
+                if upcoming_pos.size > FOCUS_LIMIT:
+                    st.caption(f"+{upcoming_pos.size - FOCUS_LIMIT} more due within 3 days -- filter Urgency by {URGENCY_LABELS[1]} in the To-Do List.")
+                if overdue_pos.size:
+                    # Semua yang tertunggak, paling lama dulu, dalam satu elemen -- kos render tak ikut bilangan tugasan
+                    lines = [f"- **{task}** ({subject}) - {-d} days late" for task, subject, d in zip(tasks_view["Task"].iloc[overdue_pos], tasks_view["Subject"].iloc[overdue_pos], overdue_days)]
+                    st.warning(f"**OVERDUE 🚨 ({overdue_pos.size})**\n" + "\n".join(lines))
             else: st.success("No urgent tasks right now. Time for a break! ☕")
         else: st.info("Add tasks in the To-Do List.")
     st.markdown("---")
     st.subheader("💡 Scratchpad")
-    new_note = st.text_area("Dump your thoughts here:", value=st.session_state.quick_notes, height=150)
-    if new_note != st.session_state.quick_notes:
-        st.session_state.quick_notes = new_note
+    new_note = st.text_area("Dump your thoughts here:", value=note_text("scratchpad"), height=150, placeholder=NOTE_PLACEHOLDER)
+    if save_note("scratchpad", new_note):
         st.toast("Note auto-saved!", icon="🐱")
 
 # --- 2. TO-DO LIST ---
 elif page_selection == "📝 To-Do List":
     st.title("📝 Daily Tasks")
-    if client: st.caption("🟢 Connected to Google Sheets Database")
+    st.caption(storage.label)
     
     with st.expander("➕ Add New Task", expanded=False):
         with st.form("new_task_form", clear_on_submit=True):
@@ -230,37 +1658,34 @@ elif page_selection == "📝 To-Do List":
                 subject_name = st.text_input("Course / Subject")
             with col2:
                 deadline = st.date_input("Deadline")
-                priority = st.selectbox("Priority Level", ["High", "Medium", "Low"])
+                priority = st.selectbox("Priority Level", PRIORITIES)
             notes = st.text_area("Additional Notes")
             if st.form_submit_button("Add Task") and task_name:
-                new_task = pd.DataFrame([{"Status": False, "Task": task_name, "Subject": subject_name, "Deadline": deadline, "Priority": priority, "Notes": notes}])
-                st.session_state.tasks = pd.concat([st.session_state.tasks, new_task], ignore_index=True)
-                save_data("To_Do_List", st.session_state.tasks) 
+                add_record("tasks", {"Status": False, "Task": task_name, "Subject": subject_name, "Deadline": deadline, "Priority": priority, "Notes": notes})
                 st.success("Task added and saved to Database successfully!")
+    bulk_import("tasks")
 
     if not st.session_state.tasks.empty:
-        display_df = st.session_state.tasks.copy()
-        today = datetime.date.today()
-        def get_urgency(date_val):
-            try:
-                days_left = (pd.to_datetime(date_val).date() - today).days
-                if days_left < 0: return "🚨 Overdue"
-                elif days_left <= 3: return "🔴 Urgent"
-                elif days_left <= 7: return "🟡 Soon"
-                else: return "🟢 Chill"
-            except: return "🟢 Chill"
-                
-        display_df.insert(1, "Urgency", display_df["Deadline"].apply(get_urgency))
-        edited_df = st.data_editor(display_df, column_config={"Status": st.column_config.CheckboxColumn("Done?", default=False)}, disabled=["Urgency", "Task", "Subject", "Deadline", "Priority", "Notes"], hide_index=True, use_container_width=True)
-        clean_edited_df = edited_df.drop(columns=["Urgency"])
-        
-        if not clean_edited_df.equals(st.session_state.tasks):
-            st.session_state.tasks = clean_edited_df
-            save_data("To_Do_List", st.session_state.tasks)
+        df_tasks = st.session_state.tasks
+        index = deadline_index("tasks", df_tasks, "Deadline")
+        f1, f2, f3, f4, f5 = st.columns([2, 1, 2, 2, 2])
+        day_range = date_range_filter(f1, "Deadline between", index)
+        show = f2.selectbox("Show", ["All", "Pending", "Done"])
+        f_priority = f3.multiselect("Priority", PRIORITIES)
+        f_urgency = f4.multiselect("Urgency", URGENCY_LABELS)
+        f_text = f5.text_input("Search tasks")
+        positions = query_positions(df_tasks, index, day_range, {"Status": {"All": [], "Pending": [False], "Done": [True]}[show], "Priority": f_priority}, f_text, ["Task", "Subject", "Notes"])
+        if positions.size and f_urgency:
+            positions = positions[urgency(days_left(df_tasks["Deadline"].iloc[positions])).isin(f_urgency)]
+        shown = paginate(positions)
+
+        display_df = df_tasks.iloc[shown].copy()
+        display_df.insert(1, "Urgency", urgency(days_left(display_df["Deadline"])))
+        st.data_editor(display_df, key="tasks_editor", on_change=apply_editor_delta, args=("tasks", "tasks_editor", shown), column_config={"Status": st.column_config.CheckboxColumn("Done?", default=False), "Deadline": st.column_config.DateColumn("Deadline")}, disabled=["Urgency", "Task", "Subject", "Deadline", "Priority", "Notes"], hide_index=True, use_container_width=True)
 
         if st.button("🧹 Clear Completed Tasks"):
-            st.session_state.tasks = st.session_state.tasks[st.session_state.tasks["Status"] == False]
-            save_data("To_Do_List", st.session_state.tasks) 
+            done = st.session_state.tasks["Status"] == True
+            commit_dataset("tasks", st.session_state.tasks[~done], removed=st.session_state.tasks[done])
             st.rerun()
 
 # --- 3. PROJECT MANAGER ---
@@ -276,86 +1701,165 @@ elif page_selection == "👥 Project Manager":
                 members = st.text_input("Team Members (Comma separated)")
                 due_date = st.date_input("Submission Date")
             if st.form_submit_button("Add Project") and proj_name:
-                new_proj = pd.DataFrame([{"Project Name": proj_name, "Subject": subj_name, "Team Members": members, "Status": "Not Started", "Due Date": due_date}])
-                st.session_state.assignments = pd.concat([st.session_state.assignments, new_proj], ignore_index=True)
-                save_data("Assignments", st.session_state.assignments)
+                add_record("assignments", {"Project Name": proj_name, "Subject": subj_name, "Team Members": members, "Status": "Not Started", "Due Date": due_date})
                 st.success("Project added successfully!")
     if not st.session_state.assignments.empty:
-        old_ass = st.session_state.assignments.copy()
-        edited_proj = st.data_editor(st.session_state.assignments, column_config={"Status": st.column_config.SelectboxColumn("Progress", options=["Not Started", "In Progress", "Completed"], required=True)}, hide_index=True, use_container_width=True)
-        if not old_ass.equals(edited_proj):
-            st.session_state.assignments = edited_proj
-            save_data("Assignments", st.session_state.assignments)
+        st.data_editor(st.session_state.assignments, key="assignments_editor", on_change=apply_editor_delta, args=("assignments", "assignments_editor"), column_config={"Status": st.column_config.SelectboxColumn("Progress", options=PROJECT_STATUSES, required=True), "Due Date": st.column_config.DateColumn("Due Date")}, hide_index=True, use_container_width=True)
 
 # --- 4. FINANCIAL TRACKER ---
 elif page_selection == "💰 Financial Tracker":
     st.title("💰 Finance Tracker")
-    tab1, tab2 = st.tabs(["📊 Overview", "➕ Add Transaction"])
+    tab1, tab2, tab3 = st.tabs(["📊 Overview", "➕ Add Transaction", "🎯 Budgets"])
+    this_month = datetime.date.today().strftime("%Y-%m")
     with tab2:
         with st.form("finance_form", clear_on_submit=True):
-            f_type = st.radio("Transaction Type", ["Income", "Expense"], horizontal=True)
-            f_cat = st.selectbox("Category", ["Food", "Business", "Transport", "Study Materials", "Personal", "Others"])
+            f_type = st.radio("Transaction Type", TXN_TYPES, horizontal=True)
+            f_cat = st.selectbox("Category", FIN_CATEGORIES)
             f_amt = st.number_input("Amount (RM)", min_value=0.0, step=1.0)
             f_desc = st.text_input("Description")
             f_date = st.date_input("Date")
             if st.form_submit_button("Record Transaction") and f_amt > 0:
-                new_fin = pd.DataFrame([{"Date": f_date, "Type": f_type, "Category": f_cat, "Amount": f_amt, "Description": f_desc}])
-                st.session_state.finances = pd.concat([st.session_state.finances, new_fin], ignore_index=True)
-                save_data("Finances", st.session_state.finances)
+                add_record("finances", {"Date": f_date, "Type": f_type, "Category": f_cat, "Amount": f_amt, "Description": f_desc})
+                # Amaran bajet dipaparkan sekali sahaja, dalam tab Overview (semua tab dirender dalam run yang sama)
                 st.success("Transaction recorded!")
+        bulk_import("finances")
+    with tab3:
+        with st.form("budget_form", clear_on_submit=True):
+            b_cat = st.selectbox("Budget Category", FIN_CATEGORIES)
+            b_limit = st.number_input("Monthly Limit (RM, 0 to remove)", min_value=0.0, step=10.0)
+            if st.form_submit_button("Save Budget"):
+                budgets = st.session_state.budgets
+                hit = np.flatnonzero(budgets["Category"] == b_cat)
+                if b_limit <= 0:
+                    commit_dataset("budgets", budgets.drop(index=budgets.index[hit]).reset_index(drop=True))
+                elif hit.size:
+                    budgets.iloc[hit[0], budgets.columns.get_loc("Limit")] = b_limit
+                    commit_dataset("budgets", budgets, rows=[int(hit[0])])
+                else:
+                    add_record("budgets", {"Category": b_cat, "Limit": b_limit})
+                st.success("Budget saved!")
+        if not st.session_state.budgets.empty:
+            agg = aggregates_for(["finances"], {"finances": st.session_state.finances})
+            st.write(f"**Budget Usage ({this_month})**")
+            st.dataframe(budget_status(agg, st.session_state.budgets, this_month), column_config={"Limit": st.column_config.NumberColumn("Limit (RM)", format="%.2f"), "Spent": st.column_config.NumberColumn("Spent (RM)", format="%.2f"), "Used": st.column_config.ProgressColumn("Used", format="percent", min_value=0, max_value=1)}, hide_index=True, use_container_width=True)
+        else: st.info("No budgets set yet.")
     with tab1:
         if not st.session_state.finances.empty:
             df_fin = st.session_state.finances
-            t_in = df_fin[df_fin["Type"] == "Income"]["Amount"].sum()
-            t_out = df_fin[df_fin["Type"] == "Expense"]["Amount"].sum()
+            agg = aggregates_for(["finances"], {"finances": df_fin})
+            budget_alerts(budget_status(agg, st.session_state.budgets, this_month))
+            t_in = agg.value("finances", ("type", "Income"))
+            t_out = agg.value("finances", ("type", "Expense"))
             c1, c2, c3 = st.columns(3)
             c1.metric("Total Income", f"RM {t_in:.2f}")
             c2.metric("Total Expenses", f"RM {t_out:.2f}")
             c3.metric("Net Balance", f"RM {(t_in - t_out):.2f}")
-            df_exp = df_fin[df_fin["Type"] == "Expense"]
-            if not df_exp.empty:
+
+            cashflow = monthly_cashflow(agg)
+            last_month = (datetime.date.today().replace(day=1) - datetime.timedelta(days=1)).strftime("%Y-%m")
+            now_m = cashflow.loc[this_month] if this_month in cashflow.index else pd.Series(0.0, index=TXN_TYPES)
+            prev_m = cashflow.loc[last_month] if last_month in cashflow.index else pd.Series(0.0, index=TXN_TYPES)
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Income This Month", f"RM {now_m['Income']:.2f}", f"{now_m['Income'] - prev_m['Income']:+.2f} vs last month")
+            m2.metric("Expenses This Month", f"RM {now_m['Expense']:.2f}", f"{now_m['Expense'] - prev_m['Expense']:+.2f} vs last month", delta_color="inverse")
+            m3.metric("Net This Month", f"RM {(now_m['Income'] - now_m['Expense']):.2f}", f"{(now_m['Income'] - now_m['Expense']) - (prev_m['Income'] - prev_m['Expense']):+.2f} vs last month")
+            if not cashflow.empty:
+                st.write("**Monthly Cashflow**")
+                st.bar_chart(cashflow, color=["#253A82", "#88A2FF"], stack=False)
+                st.write("**Running Balance**")
+                st.line_chart(running_balance(agg), color="#253A82")
+            expense_breakdown = agg.series("finances", "expense")
+            if not expense_breakdown.empty:
                 st.write("**Expense Breakdown**")
-                st.bar_chart(df_exp.groupby("Category")["Amount"].sum(), color="#88A2FF")
+                st.bar_chart(expense_breakdown, color="#88A2FF")
             st.write("**Transaction History**")
-            st.dataframe(df_fin, hide_index=True, use_container_width=True)
+            index = deadline_index("finances", df_fin, "Date")
+            f1, f2, f3, f4 = st.columns([2, 1, 2, 2])
+            day_range = date_range_filter(f1, "Date between", index)
+            h_type = f2.multiselect("Type", TXN_TYPES)
+            h_cat = f3.multiselect("Category", FIN_CATEGORIES)
+            h_text = f4.text_input("Search description")
+            positions = query_positions(df_fin, index, day_range, {"Type": h_type, "Category": h_cat}, h_text, ["Description"], newest_first=True)
+            st.dataframe(df_fin.iloc[paginate(positions)], column_config={"Date": st.column_config.DateColumn("Date")}, hide_index=True, use_container_width=True)
 
 # --- 5. CLASS SCHEDULE ---
 elif page_selection == "📅 Class Schedule":
     st.title("📅 Weekly Schedule & Countdown")
     col1, col2 = st.columns([2, 1])
+    df_sched = st.session_state.schedule
+    index = timetable_index(df_sched)
     with col1:
         with st.expander("➕ Add Class Session", expanded=False):
             with st.form("class_form", clear_on_submit=True):
-                c_day = st.selectbox("Day", ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"])
+                c_day = st.selectbox("Day", WEEKDAYS)
                 c_time = st.text_input("Time (e.g., 10:00 AM - 12:00 PM)")
                 c_sub = st.text_input("Course Name")
                 c_loc = st.text_input("Location / Hall")
+                c_force = st.checkbox("Add even if it clashes")
                 if st.form_submit_button("Add Class"):
-                    new_c = pd.DataFrame([{"Day": c_day, "Time": c_time, "Subject": c_sub, "Location": c_loc}])
-                    st.session_state.schedule = pd.concat([st.session_state.schedule, new_c], ignore_index=True)
-                    save_data("Schedule", st.session_state.schedule)
-                    st.rerun()
-        if not st.session_state.schedule.empty:
-            st.dataframe(st.session_state.schedule, hide_index=True, use_container_width=True)
+                    start, end = parse_times([c_time])
+                    clashes = index.overlapping(c_day, start[0], end[0]) if not np.isnan(start[0]) else []
+                    if np.isnan(start[0]):
+                        st.error("Couldn't read that time. Use a format like 10:00 AM - 12:00 PM.")
+                    elif len(clashes) and not c_force:
+                        st.error(f"⛔ Clashes with {describe_sessions(df_sched, clashes)} on {c_day}.")
+                    else:
+                        add_record("schedule", {"Day": c_day, "Time": c_time, "Subject": c_sub, "Location": c_loc})
+                        st.rerun()
+        if not df_sched.empty:
+            st.write("🗓️ **Weekly Timetable**")
+            days = WEEKDAYS + sorted(set(index.days) - set(WEEKDAYS))
+            st.dataframe(index.grid(df_sched["Subject"].to_numpy(), days), use_container_width=True)
+            if index.unreadable.size:
+                st.caption(f"⚠️ Not shown in the timetable (unreadable time): {describe_sessions(df_sched, index.unreadable)}")
+            st.dataframe(df_sched, hide_index=True, use_container_width=True)
             if st.button("Kosongkan Jadual"):
-                st.session_state.schedule = pd.DataFrame(columns=["Day", "Time", "Subject", "Location"])
-                save_data("Schedule", st.session_state.schedule)
+                commit_dataset("schedule", st.session_state.schedule.iloc[0:0])
                 st.rerun()
     with col2:
         st.write("### ⏳ Exam Countdown")
         new_exam = st.date_input("Set Final Exam Date", value=st.session_state.exam_date)
         if new_exam != st.session_state.exam_date: st.session_state.exam_date = new_exam
-        days_left = (st.session_state.exam_date - datetime.date.today()).days
-        if days_left > 0: st.info(f"**{days_left} days** remaining until finals. Keep pushing!")
-        elif days_left == 0: st.warning("🚨 Finals begin TODAY! Best of luck!")
+        exam_days = (st.session_state.exam_date - datetime.date.today()).days
+        if exam_days > 0: st.info(f"**{exam_days} days** remaining until finals. Keep pushing!")
+        elif exam_days == 0: st.warning("🚨 Finals begin TODAY! Best of luck!")
+        starts, ends, exam_classes = index.sessions(st.session_state.exam_date.strftime("%A"))
+        if exam_days >= 0 and exam_classes.size:
+            st.warning(f"📌 Exam day ({st.session_state.exam_date:%A}) normally has {describe_sessions(df_sched, exam_classes)}.")
+
+        st.write("### 📌 Deadlines vs Classes")
+        try:
+            tasks_view = dataset_views({"tasks": ["Status", "Task", "Subject", "Deadline"]})["tasks"]
+        except storage.Error as e:
+            show_storage_error(e)
+        positions, days = deadline_index("tasks", tasks_view, "Deadline").between(0, 14)
+        pending = ~tasks_view["Status"].to_numpy(dtype=bool)[positions]
+        shown = 0
+        for pos, day in zip(positions[pending], days[pending]):
+            due = datetime.date.today() + datetime.timedelta(days=int(day))
+            starts, ends, on_day = index.sessions(due.strftime("%A"))
+            if not on_day.size:
+                continue
+            task = tasks_view.iloc[pos]
+            same = on_day[df_sched["Subject"].iloc[on_day].str.strip().str.lower().to_numpy() == str(task["Subject"]).strip().lower()]
+            if same.size:
+                st.write(f"- **{task['Task']}** ({due:%a %d %b}) - hand it in at {describe_sessions(df_sched, same)}")
+            else:
+                st.write(f"- **{task['Task']}** ({due:%a %d %b}) - {on_day.size} classes, {(ends - starts).sum() / 60:.1f}h that day")
+            shown += 1
+        if not shown: st.caption("No pending deadlines on class days in the next 2 weeks.")
 
 # --- 6. QUICK NOTES ---
 elif page_selection == "💡 Quick Notes":
     st.title("💡 Unstructured Notes")
     st.write("A clean space for your brainstorming and sudden ideas.")
-    note_content = st.text_area("Start typing...", value=st.session_state.quick_notes, height=400)
+    note_content = st.text_area("Start typing...", value=note_text("notes"), height=400, placeholder=NOTE_PLACEHOLDER)
+    changed = save_note("notes", note_content)
     if st.button("Save Notes"):
-        st.session_state.quick_notes = note_content
+        # Tulis sekarang tanpa tunggu debounce
+        save_data("Notes", st.session_state.notes, delay=0)
+        changed = True
+    if changed:
         st.toast("Notes saved successfully!", icon="🐱")
 
 # --- 7. SCHOLARSHIP TRACKER ---
@@ -366,43 +1870,36 @@ elif page_selection == "🎓 Scholarship Tracker":
             col1, col2 = st.columns(2)
             with col1:
                 sch_name = st.text_input("Scholarship Name")
-                bond_status = st.selectbox("Bond Requirement?", ["Yes", "No", "Unsure"])
+                bond_status = st.selectbox("Bond Requirement?", BOND_OPTIONS)
             with col2:
                 due_date = st.date_input("Closing Date")
-                app_status = st.selectbox("Application Status", ["Not Started", "In Progress", "Application Submitted"])
-            sch_result = st.selectbox("Result Status", ["Pending Result", "Interview Stage", "Successful", "Unsuccessful"])
+                app_status = st.selectbox("Application Status", APP_STATUSES)
+            sch_result = st.selectbox("Result Status", RESULT_STATUSES)
             if st.form_submit_button("Add Record") and sch_name:
-                new_sch = pd.DataFrame([{"Scholarship Name": sch_name, "Bond": bond_status, "Due Date": due_date, "App Status": app_status, "Result": sch_result}])
-                st.session_state.scholarships = pd.concat([st.session_state.scholarships, new_sch], ignore_index=True)
-                save_data("Scholarships", st.session_state.scholarships)
+                add_record("scholarships", {"Scholarship Name": sch_name, "Bond": bond_status, "Due Date": due_date, "App Status": app_status, "Result": sch_result})
                 st.success("Record added!")
     if not st.session_state.scholarships.empty:
-        old_df = st.session_state.scholarships.copy()
-        edited_sch_df = st.data_editor(st.session_state.scholarships, column_config={"App Status": st.column_config.SelectboxColumn("App Status", options=["Not Started", "In Progress", "Application Submitted"], required=True), "Result": st.column_config.SelectboxColumn("Result", options=["Pending Result", "Interview Stage", "Successful", "Unsuccessful"], required=True)}, disabled=["Scholarship Name", "Bond", "Due Date"], hide_index=True, use_container_width=True)
-        if not old_df.equals(edited_sch_df):
-            for i in range(len(edited_sch_df)):
-                try:
-                    if old_df.iloc[i]["Result"] != edited_sch_df.iloc[i]["Result"]:
-                        new_res = edited_sch_df.iloc[i]["Result"]
-                        name = edited_sch_df.iloc[i]["Scholarship Name"]
-                        if new_res == "Successful":
-                            st.balloons()
-                            try: st.image("cat_party.png", width=200)
-                            except: pass
-                            msgs = [f"🎉 ALHAMDULILLAH! Your hard work paid off for {name}!", f"🔥 Awesome! {name} secured. Time to celebrate!", f"🌟 Atok must be so proud of you getting {name}. Keep moving forward!"]
-                            st.success(random.choice(msgs))
-                        elif new_res == "Unsuccessful":
-                            try: st.image("cat_support.png", width=200)
-                            except: pass
-                            st.info(f"💪 Don't be discouraged. Missing out on {name} just means something better is coming.")
-                except IndexError: pass
-            st.session_state.scholarships = edited_sch_df
-            save_data("Scholarships", st.session_state.scholarships)
+        st.data_editor(st.session_state.scholarships, key="scholarships_editor", on_change=apply_editor_delta, args=("scholarships", "scholarships_editor"), kwargs={"track_changes": True}, column_config={"App Status": st.column_config.SelectboxColumn("App Status", options=APP_STATUSES, required=True), "Result": st.column_config.SelectboxColumn("Result", options=RESULT_STATUSES, required=True), "Due Date": st.column_config.DateColumn("Due Date")}, disabled=["Scholarship Name", "Bond", "Due Date"], hide_index=True, use_container_width=True)
+        if "scholarships" in st.session_state._editor_changes:
+            # Hanya baris yang disunting dalam rerun ini
+            before, after = st.session_state._editor_changes.pop("scholarships")
+            for old_res, new_res, name in zip(before["Result"], after["Result"], after["Scholarship Name"]):
+                if old_res != new_res:
+                    if new_res == "Successful":
+                        st.balloons()
+                        try: st.image("cat_party.png", width=200)
+                        except: pass
+                        msgs = [f"🎉 ALHAMDULILLAH! Your hard work paid off for {name}!", f"🔥 Awesome! {name} secured. Time to celebrate!", f"🌟 Atok must be so proud of you getting {name}. Keep moving forward!"]
+                        st.success(random.choice(msgs))
+                    elif new_res == "Unsuccessful":
+                        try: st.image("cat_support.png", width=200)
+                        except: pass
+                        st.info(f"💪 Don't be discouraged. Missing out on {name} just means something better is coming.")
 
 # --- 8. CGPA TRACKER ---
 elif page_selection == "📊 CGPA Tracker":
     st.title("📊 Academic Performance")
-    current_sem = st.selectbox("Select Semester:", ["Semester 1", "Semester 2", "Semester 3", "Semester 4", "Semester 5", "Semester 6", "Semester 7", "Semester 8"])
+    current_sem = st.selectbox("Select Semester:", SEMESTERS)
     st.markdown("---")
     
     if current_sem not in st.session_state.sem_targets:
@@ -413,13 +1910,12 @@ elif page_selection == "📊 CGPA Tracker":
             t_cred = c_t2.number_input("Total Credit Hours this semester?", min_value=1, step=1)
             if st.form_submit_button("Confirm Initialization"):
                 st.session_state.sem_targets[current_sem] = {"subjects": t_sub, "credits": t_cred}
-                df_targets = pd.DataFrame.from_dict(st.session_state.sem_targets, orient='index').reset_index().rename(columns={'index':'Semester'})
-                save_data("Targets", df_targets)
+                save_data("Targets", targets_to_frame(st.session_state.sem_targets))
                 st.rerun()
     else:
         t_sub = st.session_state.sem_targets[current_sem]["subjects"]
-        df_sem = st.session_state.cgpa_data[st.session_state.cgpa_data['Semester'] == current_sem]
-        curr_count = len(df_sem)
+        agg = aggregates_for(["cgpa_data"], {"cgpa_data": st.session_state.cgpa_data})
+        curr_count = int(agg.value("cgpa_data", ("sem_subjects", current_sem)))
         tab_res, tab_hist = st.tabs(["📝 Record Results", "📋 Semester Overview"])
         with tab_res:
             if curr_count < t_sub:
@@ -431,12 +1927,11 @@ elif page_selection == "📊 CGPA Tracker":
                     c_cred = c2.number_input("Credit Hours", min_value=1, max_value=6, step=1)
                     c_grd = c2.selectbox("Grade Achieved", list(grade_map.keys()))
                     if st.form_submit_button("Add Subject Record"):
-                        new_sub = pd.DataFrame([{"Semester": current_sem, "Code": c_code, "Subject": c_name, "Credit": c_cred, "Grade": c_grd, "Pointer": grade_map[c_grd]}])
-                        st.session_state.cgpa_data = pd.concat([st.session_state.cgpa_data, new_sub], ignore_index=True)
-                        save_data("CGPA", st.session_state.cgpa_data)
+                        add_record("cgpa_data", {"Semester": current_sem, "Code": c_code, "Subject": c_name, "Credit": c_cred, "Grade": c_grd, "Pointer": grade_map[c_grd]})
                         st.rerun()
             else:
-                gpa_val = (df_sem['Pointer'] * df_sem['Credit']).sum() / df_sem['Credit'].sum() if df_sem['Credit'].sum() > 0 else 0.0
+                sem_credits = agg.value("cgpa_data", ("sem_credits", current_sem))
+                gpa_val = agg.value("cgpa_data", ("sem_points", current_sem)) / sem_credits if sem_credits > 0 else 0.0
                 st.success(f"✅ All {t_sub} subjects recorded for {current_sem}!")
                 st.markdown(f"## 🎯 GPA: **{gpa_val:.2f}**")
                 if gpa_val >= 3.67:
@@ -452,24 +1947,73 @@ elif page_selection == "📊 CGPA Tracker":
                     st.info(f"Alhamdulillah, finished with a {gpa_val:.2f}. Rest up, and let's push harder for the Dean's List next semester!")
                 
                 if st.button("Reset Semester Data", type="primary"):
-                    st.session_state.cgpa_data = st.session_state.cgpa_data[st.session_state.cgpa_data['Semester'] != current_sem]
-                    save_data("CGPA", st.session_state.cgpa_data)
+                    in_sem = st.session_state.cgpa_data['Semester'] == current_sem
+                    commit_dataset("cgpa_data", st.session_state.cgpa_data[~in_sem], removed=st.session_state.cgpa_data[in_sem])
                     del st.session_state.sem_targets[current_sem]
                     
-                    df_targets = pd.DataFrame.from_dict(st.session_state.sem_targets, orient='index').reset_index().rename(columns={'index':'Semester'})
-                    save_data("Targets", df_targets)
+                    save_data("Targets", targets_to_frame(st.session_state.sem_targets))
                     st.rerun()
         with tab_hist:
-            st.dataframe(df_sem, hide_index=True, use_container_width=True)
+            st.dataframe(st.session_state.cgpa_data[st.session_state.cgpa_data['Semester'] == current_sem], hide_index=True, use_container_width=True)
 
+    st.markdown("---")
+    bulk_import("cgpa_data")
+    agg = aggregates_for(["cgpa_data"], {"cgpa_data": st.session_state.cgpa_data})
+    total_credits = agg.value("cgpa_data", "credits")
+    total_points = agg.value("cgpa_data", "quality_points")
     if not st.session_state.cgpa_data.empty:
         st.markdown("---")
-        df_all = st.session_state.cgpa_data
-        cgpa_tot = (df_all['Credit'] * df_all['Pointer']).sum() / df_all['Credit'].sum() if df_all['Credit'].sum() > 0 else 0.0
+        cgpa_tot = total_points / total_credits if total_credits > 0 else 0.0
         st.write("### 🏆 Cumulative Performance")
         c_m1, c_m2 = st.columns(2)
         c_m1.metric("Cumulative CGPA", f"{cgpa_tot:.2f}")
         c_m2.metric("Semesters Recorded", f"{len(st.session_state.sem_targets)}")
         st.write("📈 **GPA Trend**")
-        trend = df_all.groupby('Semester').apply(lambda x: (x['Pointer'] * x['Credit']).sum() / x['Credit'].sum()).reset_index(name='GPA')
-        st.line_chart(trend.set_index('Semester')['GPA'], color="#88A2FF")
+        st.line_chart(semester_summary(agg)["GPA"], color="#88A2FF")
+
+    st.markdown("---")
+    st.write("### 🎯 Target CGPA Planner")
+    c_p1, c_p2, c_p3 = st.columns(3)
+    target_cgpa = c_p1.number_input("Target CGPA", min_value=0.0, max_value=4.0, value=3.67, step=0.01)
+    extra_subjects = c_p2.number_input("Extra future subjects", min_value=0, max_value=60, step=1)
+    extra_credit = c_p3.number_input("Credits per future subject", min_value=1, max_value=6, value=3, step=1)
+    remaining = remaining_subjects(agg, st.session_state.sem_targets) + [(f"Future subject {i + 1}", int(extra_credit)) for i in range(int(extra_subjects))]
+    if not remaining:
+        st.info("No remaining subjects. Initialize a semester above or add future subjects to plan ahead.")
+    else:
+        credits = tuple(credit for _, credit in remaining)
+        planned_credits = total_credits + sum(credits)
+        needed = int(np.ceil(round(target_cgpa * 100 * planned_credits - total_points * 100, 6)))
+        plan = solve_grades(credits, needed)
+        if needed <= 0:
+            st.success(f"🎉 Your CGPA stays at or above {target_cgpa:.2f} whatever you score in the remaining {len(credits)} subjects.")
+        elif plan is None:
+            st.error(f"Not reachable: straight A's in the remaining {len(credits)} subjects gives a CGPA of {(total_points + 4 * sum(credits)) / planned_credits:.2f}.")
+        else:
+            uniform, plan = plan
+            st.info(f"You need at least **{uniform}** in every remaining subject, or a mix like the one below ({needed / 100:.2f} more quality points over {sum(credits)} credits).")
+            st.dataframe(pd.DataFrame({"Subject": [name for name, _ in remaining], "Credits": credits, "Minimum Grade": plan}), hide_index=True, use_container_width=True)
+
+# --- DIAGNOSTICS PANEL ---
+trace("page", f"page: {page_selection}", PAGE_STARTED)
+trace("phase", "rerun total", RUN_STARTED)
+if DIAGNOSTICS_ON:
+    with st.sidebar.expander("🩺 Diagnostics"):
+        summary = diagnostics.summary()
+        slowest_page = summary[summary["kind"] == "page"].head(1)
+        slowest_call = summary[summary["kind"].isin(["load", "save"])].head(1)
+        for label, row in (("Slowest page (p90)", slowest_page), ("Slowest data call (p90)", slowest_call)):
+            if not row.empty:
+                st.metric(label, f"{row['p90'].iloc[0]:.0f} ms", row["name"].iloc[0], delta_color="off")
+        st.write("**This rerun**")
+        st.dataframe(pd.DataFrame(st.session_state._trace).reindex(columns=["kind", "name", "ms", "rows", "bytes"]), hide_index=True, use_container_width=True)
+        st.write("**All sessions (ms)**")
+        st.dataframe(summary.round(1), hide_index=True, use_container_width=True)
+        if st.button("🧮 Verify Aggregates"):
+            # Bandingkan jumlah incremental dengan bina semula penuh bagi dataset yang dimuat dalam sesi ini
+            agg = st.session_state._aggregates
+            for key in AGG_COLUMNS:
+                if key in st.session_state and key in agg.totals:
+                    mismatched = agg.verify(key, st.session_state[key])
+                    if mismatched: st.error(f"{key}: {', '.join(mismatched)}")
+                    else: st.success(f"{key}: OK")
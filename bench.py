@@ -0,0 +1,366 @@
+# ==========================================
+# --- BENCHMARK: app.py dengan data sintetik ---
+# ==========================================
+# Jalankan setiap page app.py secara headless (Streamlit AppTest) atas Google Sheets palsu dalam memori.
+#   python bench.py --rows 10000 50000 --latency 0.05 --quota 60
+# Laporan: masa cold start, masa page pertama dibuka, masa rerun, panggilan API, bait setiap panggilan,
+# memori puncak. Guna untuk tangkap regresi dalam load_data / save_data / kiraan dashboard.
+import argparse
+import datetime
+import json
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+
+import gspread
+import numpy as np
+import pandas as pd
+from google.oauth2.service_account import Credentials
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+PAGES = ["🏠 Main Dashboard", "📝 To-Do List", "👥 Project Manager", "💰 Financial Tracker", "📅 Class Schedule", "💡 Quick Notes", "🎓 Scholarship Tracker", "📊 CGPA Tracker"]
+
+# --- GSPREAD PALSU ---
+class FakeResponse:
+    # Cukup untuk gspread.exceptions.APIError dan SheetsScheduler (status_code)
+    def __init__(self, code, message):
+        self.status_code, self.text = code, message
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": self.text, "status": "RESOURCE_EXHAUSTED" if self.status_code == 429 else "UNAVAILABLE"}}
+
+class FakeBackend:
+    # Keadaan dikongsi semua tab: log panggilan, latency, kuota per minit dan ralat rawak
+    def __init__(self, latency=0.0, quota=None, error_rate=0.0, seed=0):
+        self.latency, self.quota, self.error_rate = latency, quota, error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = []      # (nama, bait hantar, bait terima, saat)
+        self.window = []     # masa panggilan dalam 60 saat terakhir (untuk kuota)
+        self.revision = 0
+
+    def call(self, name, payload, fn):
+        with self.lock:
+            now = time.time()
+            self.window = [t for t in self.window if now - t < 60]
+            if self.quota is not None and len(self.window) >= self.quota:
+                self.calls.append((name + " (429)", 0, 0, 0.0))
+                raise gspread.exceptions.APIError(FakeResponse(429, "Quota exceeded for quota metric 'Read requests'"))
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.calls.append((name + " (503)", 0, 0, 0.0))
+                raise gspread.exceptions.APIError(FakeResponse(503, "The service is currently unavailable."))
+            self.window.append(now)
+        start = time.perf_counter()
+        time.sleep(self.latency)
+        with self.lock:
+            result = fn()
+            sent, received = size_of(payload), size_of(result)
+            self.calls.append((name, sent, received, time.perf_counter() - start))
+        return result
+
+    def snapshot(self):
+        with self.lock:
+            return len(self.calls)
+
+    def summary(self, since=0):
+        with self.lock:
+            calls = self.calls[since:]
+        sent = sum(c[1] for c in calls)
+        received = sum(c[2] for c in calls)
+        return {"api_calls": len(calls), "api_errors": sum(" (" in c[0] for c in calls), "bytes_sent": sent, "bytes_received": received, "bytes_per_call": round((sent + received) / len(calls)) if calls else 0}
+
+def size_of(payload):
+    # Saiz JSON seperti yang dihantar melalui rangkaian
+    if payload is None:
+        return 0
+    return len(json.dumps(payload, default=str, ensure_ascii=False).encode("utf-8"))
+
+def grid_range(a1):
+    g = gspread.utils.a1_range_to_grid_range(a1.split("!")[-1]) if a1 else {}
+    return g.get("startRowIndex", 0), g.get("endRowIndex"), g.get("startColumnIndex", 0), g.get("endColumnIndex")
+
+class FakeWorksheet:
+    def __init__(self, backend, title, sheet_id, values=None, rows=100, cols=26):
+        self.backend, self.title, self.id = backend, title, sheet_id
+        self.cells = [list(map(str, r)) for r in values or []]
+        self.row_count, self.col_count = max(rows, len(self.cells)), max(cols, max((len(r) for r in self.cells), default=0))
+
+    def _set(self, r, c, value):
+        while len(self.cells) <= r:
+            self.cells.append([])
+        row = self.cells[r]
+        while len(row) <= c:
+            row.append("")
+        row[c] = "" if value is None else str(value)
+        self.row_count, self.col_count = max(self.row_count, r + 1), max(self.col_count, c + 1)
+
+    def _write(self, a1, values):
+        r0, _, c0, _ = grid_range(a1)
+        for i, row in enumerate(values):
+            for j, value in enumerate(row):
+                self._set(r0 + i, c0 + j, value)
+        self.backend.revision += 1
+
+    def _clear(self, a1):
+        r0, r1, c0, c1 = grid_range(a1)
+        for row in self.cells[r0:r1]:
+            for j in range(c0, min(len(row), c1 if c1 is not None else len(row))):
+                row[j] = ""
+        self.backend.revision += 1
+
+    def values(self, a1=None):
+        r0, r1, c0, c1 = grid_range(a1)
+        out = [row[c0:c1] for row in self.cells[r0:r1]]
+        while out and not any(out[-1]):
+            out.pop()
+        width = max((len(r) for r in out), default=0)
+        while width and not any(len(r) >= width and r[width - 1] for r in out):
+            width -= 1
+        return [r[:width] + [""] * (width - len(r[:width])) for r in out]
+
+    def get_all_values(self, **kwargs):
+        return self.backend.call("get_all_values", None, self.values)
+
+    def update(self, range_name="A1", values=None, **kwargs):
+        return self.backend.call("update", values, lambda: self._write(range_name, values))
+
+    def _write_ranges(self, data):
+        for d in data:
+            self._write(d["range"], d["values"])
+
+    def _clear_ranges(self, ranges):
+        for a1 in ranges:
+            self._clear(a1)
+
+    def batch_update(self, data, **kwargs):
+        return self.backend.call("batch_update", data, lambda: self._write_ranges(data))
+
+    def batch_clear(self, ranges):
+        return self.backend.call("batch_clear", ranges, lambda: self._clear_ranges(ranges))
+
+    def clear(self):
+        return self.backend.call("clear", None, lambda: self._clear(None))
+
+    def append_rows(self, values, table_range=None, **kwargs):
+        return self.backend.call("append_rows", values, lambda: self._write(f"A{len(self.values()) + 1}", values))
+
+class FakeSpreadsheet:
+    def __init__(self, backend, tabs):
+        self.backend = backend
+        self.tabs = {title: FakeWorksheet(backend, title, i, values) for i, (title, values) in enumerate(tabs.items())}
+
+    def _tab(self, a1):
+        title, _, rng = a1.partition("!")
+        return self.tabs[title.strip("'")], rng
+
+    def worksheets(self):
+        return self.backend.call("worksheets", None, lambda: list(self.tabs.values()))
+
+    def worksheet(self, title):
+        def find():
+            if title not in self.tabs:
+                raise gspread.exceptions.WorksheetNotFound(title)
+            return self.tabs[title]
+        return self.backend.call("worksheet", title, find)
+
+    def add_worksheet(self, title, rows=100, cols=26, **kwargs):
+        def add():
+            self.tabs[title] = FakeWorksheet(self.backend, title, len(self.tabs), rows=int(rows), cols=int(cols))
+            return self.tabs[title]
+        return self.backend.call("add_worksheet", title, add)
+
+    def get_lastUpdateTime(self):
+        return self.backend.call("get_lastUpdateTime", None, lambda: f"rev-{self.backend.revision}")
+
+    def values_batch_get(self, ranges, params=None):
+        def get():
+            out = []
+            for a1 in ranges:
+                ws, rng = self._tab(a1)
+                values = ws.values(rng or None)
+                if params and params.get("majorDimension") == "COLUMNS":
+                    values = [list(col) for col in zip(*values)]
+                out.append({"range": a1, "values": values})
+            return {"valueRanges": out}
+        return self.backend.call("values_batch_get", {"ranges": ranges, "params": params}, get)
+
+    def values_batch_update(self, body):
+        def put():
+            for d in body["data"]:
+                ws, rng = self._tab(d["range"])
+                ws._write(rng, d["values"])
+        return self.backend.call("values_batch_update", body, put)
+
+    def batch_update(self, body):
+        def apply():
+            for request in body.get("requests", []):
+                props = request.get("addSheet", {}).get("properties")
+                if props:
+                    grid = props.get("gridProperties", {})
+                    self.tabs[props["title"]] = FakeWorksheet(self.backend, props["title"], len(self.tabs), rows=grid.get("rowCount", 100), cols=grid.get("columnCount", 26))
+            return {"replies": []}
+        return self.backend.call("batch_update", body, apply)
+
+class FakeClient:
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open(self, name):
+        return self.spreadsheet.backend.call("open", name, lambda: self.spreadsheet)
+
+def install(client):
+    # app.py: Credentials.from_service_account_info -> gspread.authorize -> klien palsu
+    Credentials.from_service_account_info = classmethod(lambda cls, *args, **kwargs: None)
+    gspread.authorize = lambda creds: client
+
+# --- DATA SINTETIK ---
+def synthetic_tabs(rows, seed=0):
+    # Tab besar: To_Do_List, Finances, CGPA, Scholarships; tab lain kecil secara realistik
+    rng = np.random.default_rng(seed)
+    today = datetime.date.today()
+    dates = lambda n, back, ahead: [str(today + datetime.timedelta(days=int(d))) for d in rng.integers(-back, ahead, n)]
+    pick = lambda options, n: rng.choice(options, n).tolist()
+    words = ["lab", "quiz", "report", "essay", "revision", "slides", "tutorial", "project", "reading", "coding"]
+    subjects = [f"SCAI{1000 + i}" for i in range(40)]
+
+    tasks = [["Status", "Task", "Subject", "Deadline", "Priority", "Notes"]] + [list(r) for r in zip(
+        pick(["TRUE", "FALSE"], rows), [f"{w} {i}" for i, w in enumerate(pick(words, rows))], pick(subjects, rows),
+        dates(rows, 365, 60), pick(["High", "Medium", "Low"], rows), pick(["", "check rubric", "group work"], rows))]
+    finances = [["Date", "Type", "Category", "Amount", "Description"]] + [list(r) for r in zip(
+        dates(rows, 3 * 365, 1), pick(["Income", "Expense"], rows), pick(["Food", "Business", "Transport", "Study Materials", "Personal", "Others"], rows),
+        [f"{a:.2f}" for a in rng.gamma(2.0, 15.0, rows)], [f"txn {i}" for i in range(rows)])]
+    grades = ["A+", "A", "A-", "B+", "B", "B-", "C+", "C"]
+    points = {"A+": 4.0, "A": 4.0, "A-": 3.67, "B+": 3.33, "B": 3.0, "B-": 2.67, "C+": 2.33, "C": 2.0}
+    cgpa_grades = pick(grades, rows)
+    cgpa = [["Semester", "Code", "Subject", "Credit", "Grade", "Pointer"]] + [list(r) for r in zip(
+        [f"Semester {s}" for s in rng.integers(1, 9, rows)], pick(subjects, rows), [f"Course {i}" for i in range(rows)],
+        rng.integers(1, 5, rows).astype(str).tolist(), cgpa_grades, [str(points[g]) for g in cgpa_grades])]
+    scholarships = [["Scholarship Name", "Bond", "Due Date", "App Status", "Result"]] + [list(r) for r in zip(
+        [f"Scholarship {i}" for i in range(rows)], pick(["Yes", "No", "Unsure"], rows), dates(rows, 365, 180),
+        pick(["Not Started", "In Progress", "Application Submitted"], rows), pick(["Pending Result", "Interview Stage", "Successful", "Unsuccessful"], rows))]
+    small = max(rows // 100, 10)
+    assignments = [["Project Name", "Subject", "Team Members", "Status", "Due Date"]] + [[f"Project {i}", subjects[i % 40], "Ali, Abu", "In Progress", str(today + datetime.timedelta(days=i % 30))] for i in range(small)]
+    schedule = [["Day", "Time", "Subject", "Location"]] + [[day, f"{h}:00 AM - {h + 1}:00 AM" if h < 11 else f"{h - 12 or 12}:00 PM - {h - 11}:00 PM", subjects[i % 40], "Hall"] for i, (day, h) in enumerate((d, h) for d in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"] for h in range(8, 17, 2))]
+    targets = [["Semester", "Subjects", "Credits"]] + [[f"Semester {s}", "6", "18"] for s in range(1, 9)]
+    return {"To_Do_List": tasks, "Finances": finances, "CGPA": cgpa, "Scholarships": scholarships, "Assignments": assignments, "Schedule": schedule, "Targets": targets,
+            "Budgets": [["Category", "Limit"], ["Food", "400"], ["Transport", "150"]], "Scratchpad": [["Part", "Text"], ["1", "remember to print notes"]],
+            "Notes": [["Part", "Text"]] + [[str(i + 1), "x" * 40000] for i in range(3)]}
+
+# --- LARIAN ---
+# Tindakan simpan setiap page (borang yang sama seperti pengguna), untuk ukur laluan save_data
+ACTIONS = {
+    "📝 To-Do List": lambda at: (widget(at.text_input, "Task Name").input("bench task"), widget(at.button, "Add Task").click()),
+    "💰 Financial Tracker": lambda at: (widget(at.number_input, "Amount (RM)").set_value(12.5), widget(at.button, "Record Transaction").click()),
+    "🎓 Scholarship Tracker": lambda at: (widget(at.text_input, "Scholarship Name").input("bench scholarship"), widget(at.button, "Add Record").click()),
+    "💡 Quick Notes": lambda at: widget(at.text_area, "Start typing...").input("edited " + "x" * 100),
+}
+
+def widget(elements, label):
+    return next(e for e in elements if e.label == label)
+
+def new_app(timeout):
+    import streamlit as st
+    # Cache proses (storage, SharedFrames, init_gsheets) dikosongkan supaya setiap larian benar-benar sejuk
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    at.secrets["app_password"] = "bench"
+    at.secrets["google_json"] = "{}"
+    at.session_state["logged_in"] = True
+    return at
+
+def timed(at, backend, step=None):
+    since = backend.snapshot()
+    start = time.perf_counter()
+    (step or at).run()
+    seconds = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return seconds, backend.summary(since)
+
+def wait_for_writes(backend, idle=1.5, limit=60):
+    # SheetWriter menulis di thread belakang: tunggu sehingga tiada panggilan baru selama `idle` saat
+    start, last, count = time.time(), time.time(), backend.snapshot()
+    while time.time() - start < limit:
+        time.sleep(0.1)
+        if backend.snapshot() != count:
+            count, last = backend.snapshot(), time.time()
+        elif time.time() - last >= idle:
+            break
+
+def bench_page(page, rows, args):
+    backend = FakeBackend(args.latency, args.quota, args.error_rate, args.seed)
+    install(FakeClient(FakeSpreadsheet(backend, synthetic_tabs(rows, args.seed))))
+    result = {"rows": rows, "page": page}
+
+    at = new_app(args.timeout)
+    result["cold_start_s"], cold = timed(at, backend)
+    result.update({f"cold_{k}": v for k, v in cold.items()})
+    if page != PAGES[0]:
+        result["page_load_s"], load = timed(at, backend, at.sidebar.radio[0].set_value(page))
+    else:
+        result["page_load_s"], load = result["cold_start_s"], cold
+    result.update({f"load_{k}": v for k, v in load.items()})
+    reruns = [timed(at, backend)[0] for _ in range(args.reruns)]
+    result["rerun_s"] = float(np.median(reruns)) if reruns else None
+
+    if page in ACTIONS and not args.skip_save:
+        wait_for_writes(backend)
+        since = backend.snapshot()
+        ACTIONS[page](at)
+        result["save_s"] = timed(at, backend)[0]
+        wait_for_writes(backend, idle=args.write_idle)
+        result.update({f"save_{k}": v for k, v in backend.summary(since).items()})
+
+    if not args.skip_memory:
+        # Pas berasingan: tracemalloc melambatkan, jadi masa di atas diukur tanpanya
+        install(FakeClient(FakeSpreadsheet(FakeBackend(seed=args.seed), synthetic_tabs(rows, args.seed))))
+        at = new_app(args.timeout)
+        tracemalloc.start()
+        at.run()
+        if page != PAGES[0]:
+            at.sidebar.radio[0].set_value(page).run()
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app.py pages against an in-memory Google Sheets stand-in.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000], help="rows per large sheet (To_Do_List, Finances, CGPA, Scholarships)")
+    parser.add_argument("--pages", nargs="+", default=PAGES, help="page labels to run (default: all)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every API call")
+    parser.add_argument("--quota", type=int, default=None, help="requests per minute before 429 is returned")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls failing with 503")
+    parser.add_argument("--reruns", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-save", action="store_true", help="skip the form-submit save measurement")
+    parser.add_argument("--write-idle", type=float, default=6.0, help="seconds without API calls before a save counts as done (above the notes debounce)")
+    parser.add_argument("--skip-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--json", help="also write results as JSON lines to this file")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        for page in args.pages:
+            print(f"[{rows} rows] {page} ...", flush=True)
+            try:
+                results.append(bench_page(page, rows, args))
+            except Exception as e:
+                results.append({"rows": rows, "page": page, "error": f"{type(e).__name__}: {e}"})
+    report = pd.DataFrame(results)
+    report["page"] = report["page"].map(lambda p: re.sub(r"^\W+", "", p))
+    columns = ["rows", "page", "cold_start_s", "page_load_s", "rerun_s", "load_api_calls", "load_bytes_per_call", "save_s", "save_api_calls", "save_bytes_sent", "peak_mb", "error"]
+    with pd.option_context("display.max_columns", None, "display.width", 200, "display.float_format", "{:.3f}".format):
+        print(report[[c for c in columns if c in report]].to_string(index=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            for row in results:
+                f.write(json.dumps(row, default=str) + "\n")
+
+if __name__ == "__main__":
+    main()